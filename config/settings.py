@@ -0,0 +1,50 @@
+# Runtime tuning. Nothing here changes reconciliation results,
+# only how the work is carried out. Each value can be overridden
+# with the matching IXTRAC_* environment variable.
+
+# "auto" picks "memory" or "disk" from the memory budget below. The disk
+# backend only helps when the CSCS is read from its own workbook
+# (--cscs-file) or a persisted index (--cscs-index): IX TRAC workbooks
+# are loaded in full, so a CSCS sheet inside one is rejected
+INDEX_BACKEND = "auto"
+
+# None = half of the machine's physical memory
+MEMORY_BUDGET_MB = None
+
+# Rough in-memory cost of one CSCS row (DataFrame + both dict indexes)
+CSCS_BYTES_PER_ROW = 4096
+
+# IX TRAC rows matched per set-based query on the disk index
+DISK_INDEX_BATCH = 50_000
+
+# Match decisions between checkpoint flushes on long runs
+CHECKPOINT_EVERY = 20_000
+
+# Preflight estimates used until calibration data from real runs exists
+IXTRAC_BYTES_PER_ROW = 2048
+SECONDS_PER_ROW = 0.0002
+
+# Past runs kept for preflight calibration
+CALIBRATION_RUNS = 50
+
+# Cross-run decision store (None, or IXTRAC_DECISION_STORE=off, disables
+# it); see decisions.py
+DECISION_STORE = "logs/decisions.sqlite"
+
+# Answer rows already decided against the same CSCS and rules from the store
+DECISION_CACHE = True
+
+# Rows per output sheet, header included (Excel's limit); longer tables
+# are split into companion workbooks
+SHEET_MAX_ROWS = 1_048_576
+
+# Zip compression of saved workbooks: 0 (store only, fastest, largest) to 9
+XLSX_COMPRESSION = 6
+
+# Result tables at least this long are serialized on worker processes
+PARALLEL_SAVE_MIN_ROWS = 50_000
+
+# Stack frames tracemalloc keeps per allocation on profiled runs. The
+# allocation report groups by line, which needs only 1; deeper stacks
+# slow a profiled run down considerably. 0 turns allocation tracking off
+PROFILE_TRACEMALLOC_FRAMES = 1
@@ -0,0 +1,227 @@
+# core/api.py
+#
+# In-memory reconciliation for embedding in other services. Nothing here
+# touches the working directory or writes files unless asked to: inputs
+# are DataFrames, paths, file-like objects or bytes, the mapping is a
+# plain dict, and results come back as DataFrames. Calls share no state,
+# so several threads can reconcile concurrently.
+
+import io
+import os
+from dataclasses import dataclass
+
+import pandas as pd
+from openpyxl import Workbook
+
+from core.engine import match_row
+from core.mapping import MappingError, ixtrac_sheet_names
+from core.matcher import prepare_cscs
+from core.membercode_rules import compile_rules
+from core.output import OutputShards, save_workbook, save_workbook_atomic, write_df_to_sheet
+from core.report import (
+    DECISION_COLUMNS,
+    combined_summary,
+    decide_rows,
+    review_frame,
+    summary_frame,
+)
+from core.sources import cscs_sources, is_federated, load_sources
+
+
+@dataclass
+class ReconciliationResult:
+    enriched: pd.DataFrame
+    review: pd.DataFrame
+    summary: pd.DataFrame
+    decisions: pd.DataFrame
+    duplicates: pd.DataFrame
+    ixtrac_sheet: str = "IX TRAC"
+
+    def to_xlsx(self, target=None, compression=None):
+        """
+        Serialize to an xlsx workbook at a path or into a file-like object.
+        With no target, returns the workbook as bytes.
+
+        Tables past Excel's row limit go to companion workbooks next to a
+        path target, or to extra sheets when writing to a buffer.
+        `compression` is the zip level (0-9, 0 = store only).
+        """
+        wb = Workbook()
+        wb.remove(wb.active)
+
+        shards = OutputShards(os.fspath(target)) if isinstance(target, (str, os.PathLike)) else None
+
+        deferred = {}
+
+        write_df_to_sheet(wb, self.ixtrac_sheet, self.enriched, shards, deferred)
+        write_df_to_sheet(wb, "IX_TRAC_REVIEW", self.review, shards, deferred)
+        write_df_to_sheet(wb, "RECONCILIATION_SUMMARY", self.summary, shards, deferred)
+        write_df_to_sheet(wb, "DECISION_LOG", self.decisions, shards, deferred)
+        write_df_to_sheet(wb, "CSCS_DUPLICATES", self.duplicates, shards, deferred)
+
+        if target is None:
+            buffer = io.BytesIO()
+            save_workbook(wb, buffer, compression, deferred)
+            return buffer.getvalue()
+
+        if shards is None:
+            save_workbook(wb, target, compression, deferred)
+            return target
+
+        shards.finish(wb)
+        save_workbook_atomic(wb, target, compression=compression, deferred=deferred)
+        return target
+
+
+@dataclass
+class WorkbookResult:
+    # One result per targeted IX TRAC sheet, in workbook order
+    results: dict
+    # Per-sheet summaries under a TARGET column, plus totals as TARGET "ALL"
+    summary: pd.DataFrame
+
+
+def _workbook_source(source):
+    """
+    Something pandas can read more than once: bytes and file-like
+    objects are buffered, paths are passed through.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    if hasattr(source, "read"):
+        return io.BytesIO(source.read())
+    return source
+
+
+def _read_sheets(source, sheets):
+    source = _workbook_source(source)
+    try:
+        return pd.read_excel(source, sheet_name=sheets, engine="openpyxl")
+    except ValueError as e:
+        raise MappingError(str(e))
+
+
+def _frame_target(mapping):
+    """
+    Sheet name reported for an IX TRAC given as a single DataFrame.
+    """
+    spec = mapping["ixtrac_sheet"]
+    if isinstance(spec, str) and not any(ch in spec for ch in "*?["):
+        return spec
+    return "IX TRAC"
+
+
+def _reconcile_frame(ix_df, sheet, mapping, rules, match_chunk, duplicates_df):
+    for col in (mapping["name"], mapping["chn"]):
+        if col not in ix_df.columns:
+            raise MappingError(f"Missing column: {col}")
+
+    # Blank cells arrive as NaN; the engine expects None like openpyxl gives
+    keys = ix_df[[mapping["name"], mapping["chn"]]].astype(object)
+    keys = keys.where(keys.notna(), None)
+
+    # ROW is the worksheet row, header being row 1
+    rows = [(i + 2, name, chn) for i, (name, chn) in enumerate(keys.itertuples(index=False, name=None))]
+    decisions = decide_rows(rows, match_chunk, rules.statuses)
+
+    enriched = ix_df.copy()
+    enriched[mapping["membercode_out"]] = [d["MEMBERCODE"] or "" for d in decisions]
+    enriched[mapping["status_out"]] = [d["DISPLAY_STATUS"] for d in decisions]
+
+    review_df = review_frame(enriched, mapping["status_out"])
+
+    return ReconciliationResult(
+        enriched=enriched,
+        review=review_df,
+        summary=summary_frame(review_df, mapping["status_out"]),
+        decisions=pd.DataFrame(decisions, columns=DECISION_COLUMNS),
+        duplicates=duplicates_df,
+        ixtrac_sheet=sheet,
+    )
+
+
+def reconcile_workbook(ixtrac, mapping: dict, cscs=None, prepared=None) -> WorkbookResult:
+    """
+    Reconcile every IX TRAC sheet a mapping targets against one CSCS
+    index. "ixtrac_sheet" may be a name, a glob or a list, as in
+    mappings.json.
+
+    `ixtrac` is a DataFrame of a single IX TRAC sheet, a dict of
+    DataFrames by sheet name (as pd.read_excel(sheet_name=None) gives)
+    or a workbook (path, file-like or bytes). Unless `cscs` is given, the
+    workbook also holds the CSCS sheet. `cscs` may be a DataFrame or
+    another workbook. Without `cscs`, a mapping's "cscs_sources" are
+    loaded and merged (sources without a file read the IX TRAC workbook).
+
+    `prepared` is an (exact_index, two_name_index, duplicates_df) triple
+    from matcher.prepare_cscs, letting callers reuse a warm CSCS index.
+    """
+    cscs_sheet = mapping.get("cscs_sheet")
+    name_col = mapping.get("cscs_name", "NAME")
+
+    # Federated sources are used unless the caller supplies the CSCS side
+    sources = cscs_sources(mapping, None) if cscs is None and prepared is None else None
+    federated = sources is not None and is_federated(sources)
+    local_sheets = [s["sheet"] for s in sources if s["file"] is None] if sources else []
+
+    if isinstance(ixtrac, pd.DataFrame):
+        targets = {_frame_target(mapping): ixtrac}
+        local = {}
+        if federated and local_sheets:
+            raise ValueError("CSCS sources without a file need IX TRAC given as a workbook")
+    else:
+        if isinstance(ixtrac, dict):
+            frames = ixtrac
+        else:
+            with pd.ExcelFile(_workbook_source(ixtrac), engine="openpyxl") as workbook:
+                names = ixtrac_sheet_names(mapping, workbook.sheet_names)
+                wanted = list(dict.fromkeys(names + local_sheets))
+                try:
+                    frames = {name: workbook.parse(name) for name in wanted}
+                except ValueError as e:
+                    raise MappingError(str(e))
+        targets = {name: frames[name] for name in ixtrac_sheet_names(mapping, list(frames))}
+        local = {name: frames[name] for name in local_sheets if name in frames}
+
+    if federated:
+        cscs = load_sources(sources, name_col, local)
+    elif cscs is None and prepared is None:
+        if cscs_sheet not in local:
+            raise ValueError("CSCS data is required when IX TRAC is given as a DataFrame")
+        cscs = local[cscs_sheet]
+    if cscs is not None and not isinstance(cscs, pd.DataFrame):
+        cscs = _read_sheets(cscs, cscs_sheet)
+
+    rules = compile_rules(mapping)
+    exact_index, two_name_index, duplicates_df = prepared or prepare_cscs(
+        cscs,
+        name_col,
+        rules,
+    )
+
+    def match_chunk(pairs):
+        return [match_row(name, chn, exact_index, two_name_index) for name, chn in pairs]
+
+    results = {
+        sheet: _reconcile_frame(ix_df, sheet, mapping, rules, match_chunk, duplicates_df)
+        for sheet, ix_df in targets.items()
+    }
+    return WorkbookResult(
+        results=results,
+        summary=combined_summary({sheet: r.summary for sheet, r in results.items()}),
+    )
+
+
+def reconcile(ixtrac, mapping: dict, cscs=None, prepared=None) -> ReconciliationResult:
+    """
+    Reconcile the one IX TRAC sheet a mapping targets, entirely in
+    memory. Arguments are as for reconcile_workbook(), which handles
+    mappings targeting several sheets.
+    """
+    results = reconcile_workbook(ixtrac, mapping, cscs, prepared).results
+    if len(results) > 1:
+        raise MappingError(
+            f"Mapping targets {len(results)} IX TRAC sheets ({', '.join(results)}); "
+            "use reconcile_workbook() to reconcile them all."
+        )
+    return next(iter(results.values()))
@@ -0,0 +1,131 @@
+# core/checkpoint.py
+#
+# Periodic checkpoints of completed match decisions, so a long run that
+# dies (sleep, file lock, crash during save) resumes where it stopped.
+# The sidecar is a gzip stream of JSON lines; each flush appends a new
+# gzip member, so a torn final write loses at most the last batch.
+
+import gzip
+import hashlib
+import json
+import os
+import zlib
+
+import pandas as pd
+
+from config.rules import RULES_VERSION
+from core.engine import MatchDecision
+
+
+def file_fingerprint(path, chunk_size=1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def frame_fingerprint(df) -> str:
+    """
+    Content hash of a DataFrame: column names, dtypes and values. Value
+    types of object columns are hashed too; hash_pandas_object alone
+    hashes 1500 and "1500" alike.
+    """
+    digest = hashlib.sha256()
+    digest.update(repr([(str(c), str(t)) for c, t in df.dtypes.items()]).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    for i, dtype in enumerate(df.dtypes):
+        if dtype == object:
+            types = df.iloc[:, i].map(lambda v: type(v).__name__)
+            digest.update(pd.util.hash_pandas_object(types, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def checkpoint_key(input_fingerprint, cscs_fingerprint, mapping, sheet=None) -> str:
+    payload = json.dumps(
+        {
+            "input": input_fingerprint,
+            "cscs": cscs_fingerprint,
+            "mapping": mapping,
+            "sheet": sheet,
+            "rules_version": RULES_VERSION,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Checkpoint:
+    def __init__(self, path, key, every=20_000):
+        self.path = path
+        self.key = key
+        self.every = every
+        self._pending = []
+
+    def load(self) -> dict:
+        """
+        Decisions saved by a previous attempt with the same key, by row.
+        A sidecar written for different inputs is discarded.
+        """
+        if not os.path.exists(self.path):
+            return {}
+
+        done = {}
+        header = None
+        torn = False
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    record = json.loads(line)
+                    if header is None:
+                        header = record
+                        if header.get("key") != self.key:
+                            break
+                        continue
+                    row, status, membercode, reason, *rest = record
+                    done[row] = MatchDecision(membercode, status, reason, *rest)
+        except (EOFError, OSError, zlib.error, json.JSONDecodeError, ValueError):
+            # Interrupted mid-write: keep everything read so far
+            torn = True
+
+        if header is None or header.get("key") != self.key:
+            self.remove()
+            return {}
+
+        if torn:
+            # Rewrite cleanly so later appends are not hidden behind the tear
+            self.remove()
+            for row, decision in done.items():
+                self.record(row, decision)
+            self.flush()
+
+        return done
+
+    def record(self, row, decision):
+        self._pending.append([
+            row, decision.status, decision.membercode, decision.reason, decision.source
+        ])
+        if len(self._pending) >= self.every:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+
+        lines = []
+        if not os.path.exists(self.path):
+            lines.append(json.dumps({"key": self.key}))
+        lines.extend(json.dumps(record, default=str) for record in self._pending)
+
+        with open(self.path, "ab") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="ab") as f:
+                f.write(("\n".join(lines) + "\n").encode("utf-8"))
+            raw.flush()
+            os.fsync(raw.fileno())
+
+        self._pending = []
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,328 @@
+# core/daemon.py
+#
+# Watch-folder ingestion: workbooks dropped in an inbox are matched to a
+# mapping by their sheet/header signature and reconciled on a persistent
+# worker pool. Inputs and results move to the outbox, failures to the
+# error folder, and every job is tracked in a small SQLite database.
+#
+# Changes are picked up through watchdog (inotify on Linux) when it is
+# installed, otherwise by polling.
+
+import os
+import shutil
+import sqlite3
+import threading
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+import pandas as pd
+
+from core.api import reconcile_workbook
+from core.checkpoint import frame_fingerprint
+from core.mapping import MappingError, load_mappings
+from core.matcher import prepare_cscs
+from core.membercode_rules import compile_rules
+from core.signature import detect_mapping
+from core.sources import cscs_sources, is_federated, load_sources
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+
+JOB_QUEUED = "QUEUED"
+JOB_RUNNING = "RUNNING"
+JOB_DONE = "DONE"
+JOB_FAILED = "FAILED"
+
+# Attempts a job gets when its worker process dies under it
+_MAX_ATTEMPTS = 2
+
+
+# =================================================
+# JOB STATE
+# =================================================
+class JobStore:
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " file TEXT,"
+            " mapping TEXT,"
+            " state TEXT,"
+            " queued_at TEXT,"
+            " finished_at TEXT,"
+            " output TEXT,"
+            " error TEXT)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_state ON jobs (state)")
+        self.conn.commit()
+
+    def add(self, file, mapping):
+        cursor = self.conn.execute(
+            "INSERT INTO jobs (file, mapping, state, queued_at) VALUES (?, ?, ?, ?)",
+            (file, mapping, JOB_QUEUED, datetime.now().isoformat()),
+        )
+        self.conn.commit()
+        return cursor.lastrowid
+
+    def update(self, job_id, state, output=None, error=None):
+        finished = datetime.now().isoformat() if state in (JOB_DONE, JOB_FAILED) else None
+        self.conn.execute(
+            "UPDATE jobs SET state = ?, finished_at = ?, output = ?, error = ? WHERE id = ?",
+            (state, finished, output, error, job_id),
+        )
+        self.conn.commit()
+
+    def unfinished(self):
+        return self.conn.execute(
+            "SELECT id, file, mapping FROM jobs WHERE state IN (?, ?)",
+            (JOB_QUEUED, JOB_RUNNING),
+        ).fetchall()
+
+
+# =================================================
+# WORKER (runs in pool processes)
+# =================================================
+_warm_indexes = {}
+_WARM_LIMIT = 4
+
+
+def _cscs_key(cscs, mapping):
+    return (frame_fingerprint(cscs), mapping.get("cscs_name", "NAME"), compile_rules(mapping).key)
+
+
+def run_job(file_path, mapping, output_path):
+    """
+    Reconcile one workbook. The prepared CSCS index is kept in the
+    worker process and reused while the CSCS content is unchanged.
+    """
+    frames = pd.read_excel(file_path, sheet_name=None, engine="openpyxl")
+
+    sources = cscs_sources(mapping, None)
+    if is_federated(sources):
+        cscs = load_sources(sources, mapping.get("cscs_name", "NAME"), frames)
+    elif mapping["cscs_sheet"] in frames:
+        cscs = frames[mapping["cscs_sheet"]]
+    else:
+        raise MappingError(f"CSCS sheet '{mapping['cscs_sheet']}' not found")
+
+    key = _cscs_key(cscs, mapping)
+    prepared = _warm_indexes.get(key)
+    if prepared is None:
+        prepared = prepare_cscs(cscs, mapping.get("cscs_name", "NAME"), compile_rules(mapping))
+        if len(_warm_indexes) >= _WARM_LIMIT:
+            _warm_indexes.pop(next(iter(_warm_indexes)))
+        _warm_indexes[key] = prepared
+
+    # A mapping targeting several sheets gives one output per sheet
+    results = list(reconcile_workbook(frames, mapping, prepared=prepared).results.values())
+
+    outputs = []
+    stem, ext = os.path.splitext(output_path)
+    for result in results:
+        path = output_path if len(results) == 1 else f"{stem}_{result.ixtrac_sheet}{ext}"
+        # Saved atomically; never a half-written file in the outbox
+        result.to_xlsx(path)
+        outputs.append(path)
+    return ";".join(outputs)
+
+
+# =================================================
+# DAEMON
+# =================================================
+def _unique_path(path, taken=()):
+    """
+    `path`, or a timestamped variant when it exists or is already taken
+    by a running job, so earlier inputs and results are never overwritten.
+    """
+    if not os.path.exists(path) and path not in taken:
+        return path
+    stem, ext = os.path.splitext(path)
+    stamp = f"{datetime.now():%Y%m%d%H%M%S}"
+    candidate = f"{stem}_{stamp}{ext}"
+    n = 2
+    while os.path.exists(candidate) or candidate in taken:
+        candidate = f"{stem}_{stamp}_{n}{ext}"
+        n += 1
+    return candidate
+
+
+class _InboxEvents(FileSystemEventHandler):
+    def __init__(self, wake):
+        self.wake = wake
+
+    def on_any_event(self, event):
+        self.wake.set()
+
+
+class InboxDaemon:
+    def __init__(self, inbox, outbox, errors, workers=2, poll_interval=5.0, mappings_path=None):
+        self.inbox = os.path.abspath(inbox)
+        self.outbox = os.path.abspath(outbox)
+        self.errors = os.path.abspath(errors)
+        self.poll_interval = poll_interval
+        self.mappings_path = mappings_path
+
+        for folder in (self.inbox, self.outbox, self.errors):
+            os.makedirs(folder, exist_ok=True)
+
+        self.jobs = JobStore(os.path.join(self.outbox, "jobs.sqlite"))
+        self.workers = workers
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._sizes = {}
+        self._running = {}
+
+    def _candidates(self):
+        for entry in os.scandir(self.inbox):
+            name = entry.name
+            if not entry.is_file() or name.startswith(("~$", ".")):
+                continue
+            if not name.lower().endswith(".xlsx"):
+                continue
+            yield entry
+
+    def scan(self):
+        """
+        Submit inbox files whose size has been stable since the last scan
+        (so files still being copied are left alone).
+        """
+        busy = {job[0] for job in self._running.values()}
+        sizes = {}
+
+        for entry in self._candidates():
+            if entry.path in busy:
+                continue
+            stat = entry.stat()
+            sizes[entry.path] = (stat.st_size, stat.st_mtime)
+            if self._sizes.get(entry.path) == sizes[entry.path]:
+                self.submit(entry.path)
+
+        self._sizes = sizes
+
+    def submit(self, file_path, job_id=None):
+        mappings = load_mappings(self.mappings_path)
+        try:
+            mapping_name = detect_mapping(file_path, mappings)
+        except Exception as e:
+            job_id = job_id or self.jobs.add(file_path, None)
+            self._fail(job_id, file_path, f"Unreadable workbook: {e}")
+            return
+
+        if job_id is None:
+            job_id = self.jobs.add(file_path, mapping_name)
+        if mapping_name is None:
+            self._fail(job_id, file_path, "No saved mapping matches this workbook's sheets and headers")
+            return
+
+        stem = os.path.splitext(os.path.basename(file_path))[0]
+        taken = {job[2] for job in self._running.values()}
+        output_path = _unique_path(os.path.join(self.outbox, f"{stem}_RECONCILED.xlsx"), taken)
+
+        self._start(file_path, job_id, mappings[mapping_name], output_path)
+        print(f"→ {os.path.basename(file_path)} [{mapping_name}]")
+
+    def _start(self, file_path, job_id, mapping, output_path, attempt=1):
+        try:
+            future = self.pool.submit(run_job, file_path, mapping, output_path)
+        except BrokenProcessPool:
+            self._restart_pool()
+            future = self.pool.submit(run_job, file_path, mapping, output_path)
+        self._running[future] = (file_path, job_id, output_path, mapping, attempt)
+        self.jobs.update(job_id, JOB_RUNNING)
+
+    def _restart_pool(self):
+        # A worker that died (killed, out of memory) breaks the whole pool
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        print("⚠ Worker process died; pool restarted")
+
+    def collect(self):
+        broken = []
+        pool_died = False
+        for future in [f for f in self._running if f.done()]:
+            file_path, job_id, output_path, mapping, attempt = self._running.pop(future)
+            error = future.exception()
+
+            if isinstance(error, BrokenProcessPool):
+                pool_died = True
+                if attempt < _MAX_ATTEMPTS:
+                    broken.append((file_path, job_id, output_path, mapping, attempt + 1))
+                else:
+                    self._fail(job_id, file_path, f"Worker process died {attempt} times on this workbook")
+                continue
+
+            if error is not None:
+                detail = "".join(traceback.format_exception(type(error), error, error.__traceback__))
+                self._fail(job_id, file_path, detail)
+                continue
+
+            self._move(file_path, self.outbox)
+            self.jobs.update(job_id, JOB_DONE, output=future.result())
+            print(f"✔ {os.path.basename(file_path)}")
+
+        if pool_died:
+            # Jobs caught in the crash run again on a fresh pool; one that
+            # kills its worker every time fails
+            self._restart_pool()
+            for job in broken:
+                self._start(*job)
+
+    def _fail(self, job_id, file_path, message):
+        moved = self._move(file_path, self.errors)
+        with open(moved + ".error.txt", "w", encoding="utf-8") as f:
+            f.write(message)
+        self.jobs.update(job_id, JOB_FAILED, error=message)
+        print(f"✖ {os.path.basename(file_path)}: {message.strip().splitlines()[-1]}")
+
+    def _move(self, file_path, folder):
+        target = _unique_path(os.path.join(folder, os.path.basename(file_path)))
+        shutil.move(file_path, target)
+        return target
+
+    def _recover(self):
+        # Jobs interrupted by a previous shutdown run again if their input
+        # is still in the inbox
+        for job_id, file_path, _ in self.jobs.unfinished():
+            if os.path.exists(file_path):
+                self.submit(file_path, job_id)
+            else:
+                self.jobs.update(job_id, JOB_FAILED, error="Interrupted; input no longer in the inbox")
+
+    def serve_forever(self):
+        self._recover()
+
+        observer = None
+        if Observer is not None:
+            observer = Observer()
+            observer.schedule(_InboxEvents(self._wake), self.inbox, recursive=False)
+            observer.start()
+
+        print(f"Watching {self.inbox} ({'events' if observer else 'polling'})")
+        try:
+            while not self._stop.is_set():
+                self.scan()
+                self.collect()
+                # Wake early on file events or finished jobs; a second scan
+                # after the interval confirms the file size is stable
+                self._wake.wait(self.poll_interval if not self._running else 0.5)
+                self._wake.clear()
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+            self.pool.shutdown(wait=True)
+            self.collect()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
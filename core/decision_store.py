@@ -0,0 +1,282 @@
+# core/decision_store.py
+#
+# Every run's decisions, kept across runs in one SQLite database so
+# "what did we decide for CHN X last month" is a query instead of a
+# search through old output workbooks. Each run records its mapping,
+# RULES_VERSION and input/CSCS fingerprints; decisions are indexed on
+# normalized name, CHN and membercode.
+#
+# The same table doubles as a prior-decision cache: a row whose
+# normalized name and CHN were already decided against the same CSCS
+# content and rules gets that decision without matching.
+
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+import pandas as pd
+
+from config.rules import RULES_VERSION
+from core.diskindex import chn_key, chn_keys
+from core.engine import MatchDecision
+from core.normalizer import normalize_name
+from core.sources import cscs_sources
+
+_LOOKUP_BATCH = 50_000
+
+
+def cache_key(cscs_fingerprint, mapping, rules) -> str:
+    """
+    Decisions are reusable only between runs that agree on all of this.
+    The fingerprint covers file contents, not which sheets and columns
+    were read from them, so those are part of the key too.
+    """
+    sources = [
+        [s["label"], s["sheet"], s["name_col"], s["rank"]]
+        for s in cscs_sources(mapping, None)
+    ]
+    payload = json.dumps(
+        {
+            "cscs": cscs_fingerprint,
+            "cscs_sheet": mapping.get("cscs_sheet"),
+            "cscs_name": mapping.get("cscs_name", "NAME"),
+            "sources": sources,
+            "rules": rules.key,
+            "rules_version": RULES_VERSION,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _text(value):
+    return None if value is None else str(value)
+
+
+class DecisionStore:
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self._create_schema()
+
+    def _create_schema(self):
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " recorded_at TEXT,"
+            " mapping_name TEXT,"
+            " mapping TEXT,"
+            " rules_version TEXT,"
+            " input_file TEXT,"
+            " sheet TEXT,"
+            " input_fingerprint TEXT,"
+            " cscs_fingerprint TEXT,"
+            " cache_key TEXT)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS decisions ("
+            " run_id INTEGER,"
+            " row INTEGER,"
+            " name TEXT,"
+            " norm_name TEXT,"
+            " chn TEXT,"
+            " chn_key TEXT,"
+            " status TEXT,"
+            " display_status TEXT,"
+            " membercode TEXT,"
+            " reason TEXT,"
+            " source TEXT)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS ix_runs_cache ON runs (cache_key)")
+        # (norm_name, chn_key) also serves lookups by name alone
+        self.conn.execute("CREATE INDEX IF NOT EXISTS ix_dec_name ON decisions (norm_name, chn_key)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS ix_dec_chn ON decisions (chn_key)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS ix_dec_code ON decisions (membercode)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS ix_dec_run ON decisions (run_id)")
+        self.conn.commit()
+
+    # =================================================
+    # RECORD
+    # =================================================
+    def record_run(
+        self,
+        mapping_name,
+        mapping,
+        decisions,
+        input_file=None,
+        sheet=None,
+        input_fingerprint=None,
+        cscs_fingerprint=None,
+        cache_key=None,
+    ) -> int:
+        """
+        Store one reconciled sheet. `decisions` are report.decision_record
+        dicts. Returns the run id.
+        """
+        cursor = self.conn.execute(
+            "INSERT INTO runs (recorded_at, mapping_name, mapping, rules_version,"
+            " input_file, sheet, input_fingerprint, cscs_fingerprint, cache_key)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                datetime.now().isoformat(timespec="seconds"),
+                mapping_name,
+                json.dumps(mapping, sort_keys=True, default=str),
+                RULES_VERSION,
+                input_file,
+                sheet,
+                input_fingerprint,
+                cscs_fingerprint,
+                cache_key,
+            ),
+        )
+        run_id = cursor.lastrowid
+
+        self.conn.executemany(
+            "INSERT INTO decisions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    run_id,
+                    d["ROW"],
+                    _text(d["NAME"]),
+                    normalize_name(d["NAME"]),
+                    _text(d["CHN"]),
+                    chn_key(d["CHN"]),
+                    d["STATUS"],
+                    d["DISPLAY_STATUS"],
+                    _text(d["MEMBERCODE"]),
+                    d["REASON"],
+                    d.get("SOURCE"),
+                )
+                for d in decisions
+            ),
+        )
+        self.conn.commit()
+        return run_id
+
+    # =================================================
+    # QUERY
+    # =================================================
+    def query(self, name=None, chn=None, membercode=None, mapping_name=None, since=None, limit=None):
+        """
+        Past decisions, newest run first. `name` matches on the normalized
+        name, `since` is an ISO date or datetime.
+        """
+        where = []
+        params = []
+
+        if name:
+            where.append("d.norm_name = ?")
+            params.append(normalize_name(name))
+        if chn is not None:
+            keys = chn_keys(chn)
+            where.append(f"d.chn_key IN ({', '.join('?' for _ in keys)})")
+            params.extend(keys)
+        if membercode:
+            where.append("d.membercode = ?")
+            params.append(membercode)
+        if mapping_name:
+            where.append("r.mapping_name = ?")
+            params.append(mapping_name)
+        if since:
+            where.append("r.recorded_at >= ?")
+            params.append(since)
+
+        sql = (
+            "SELECT r.id AS RUN_ID, r.recorded_at AS RECORDED_AT, r.mapping_name AS MAPPING,"
+            " r.rules_version AS RULES_VERSION, r.input_file AS INPUT_FILE, r.sheet AS SHEET,"
+            " d.row AS ROW, d.name AS NAME, d.chn AS CHN, d.status AS STATUS,"
+            " d.display_status AS DISPLAY_STATUS, d.membercode AS MEMBERCODE,"
+            " d.reason AS REASON, d.source AS SOURCE"
+            " FROM decisions d JOIN runs r ON r.id = d.run_id"
+        )
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY r.id DESC, d.row"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+    def runs(self, limit=None) -> pd.DataFrame:
+        sql = (
+            "SELECT r.id AS RUN_ID, r.recorded_at AS RECORDED_AT, r.mapping_name AS MAPPING,"
+            " r.rules_version AS RULES_VERSION, r.input_file AS INPUT_FILE, r.sheet AS SHEET,"
+            " COUNT(d.row) AS ROWS"
+            " FROM runs r LEFT JOIN decisions d ON d.run_id = r.id"
+            " GROUP BY r.id ORDER BY r.id DESC"
+        )
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return pd.read_sql_query(sql, self.conn)
+
+    # =================================================
+    # PRIOR-DECISION CACHE
+    # =================================================
+    def lookup(self, pairs, cache_key) -> dict:
+        """
+        {position: MatchDecision} for the (name, chn) pairs already decided
+        by a run with the same cache key. Pairs missing a name or CHN are
+        never looked up.
+        """
+        found = {}
+
+        for start in range(0, len(pairs), _LOOKUP_BATCH):
+            batch = pairs[start:start + _LOOKUP_BATCH]
+
+            self.conn.execute("DROP TABLE IF EXISTS temp.q")
+            self.conn.execute(
+                "CREATE TEMP TABLE q (pos INTEGER, norm_name TEXT, chn_key TEXT)"
+            )
+            self.conn.executemany(
+                "INSERT INTO q VALUES (?, ?, ?)",
+                (
+                    (start + i, normalize_name(name), chn_key(chn))
+                    for i, (name, chn) in enumerate(batch)
+                    if name and chn
+                ),
+            )
+
+            # Any earlier decision will do: the first two names derive from
+            # the normalized name, so decide() saw the same candidates
+            cursor = self.conn.execute(
+                "SELECT q.pos, d.status, d.membercode, d.reason, d.source"
+                " FROM q JOIN decisions d"
+                " ON d.norm_name = q.norm_name AND d.chn_key = q.chn_key"
+                " JOIN runs r ON r.id = d.run_id AND r.cache_key = ?",
+                (cache_key,),
+            )
+            for pos, status, membercode, reason, source in cursor:
+                found.setdefault(pos, MatchDecision(membercode, status, reason, source))
+
+            self.conn.execute("DROP TABLE temp.q")
+
+        return found
+
+    def cached(self, match_chunk, cache_key):
+        """
+        Wrap a match_chunk function so rows decided before are answered
+        from the store and only the rest are matched.
+        """
+        def match_with_cache(pairs):
+            found = self.lookup(pairs, cache_key)
+            self.hits += len(found)
+            missing = [i for i in range(len(pairs)) if i not in found]
+            fresh = match_chunk([pairs[i] for i in missing]) if missing else []
+
+            decisions = [found.get(i) for i in range(len(pairs))]
+            for i, decision in zip(missing, fresh):
+                decisions[i] = decision
+            return decisions
+
+        return match_with_cache
+
+    def close(self):
+        self.conn.close()
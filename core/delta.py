@@ -0,0 +1,84 @@
+# core/delta.py
+#
+# Persisted CSCS index maintenance: build it once from a full extract,
+# then keep it current with daily delta files instead of rebuilding.
+
+import os
+
+import pandas as pd
+
+from core.diskindex import DiskIndex
+
+
+def build_index(file_path, cscs_sheet, index_path, name_col="NAME", rules=None):
+    """
+    Build a persisted CSCS index from a full extract.
+    The new index replaces any existing one only once it is complete.
+    """
+    tmp_path = index_path + ".building"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    engine = os.path.splitext(index_path)[1].lstrip(".") or None
+    index = DiskIndex(tmp_path, engine=engine if engine in ("duckdb", "sqlite") else None)
+    try:
+        index.load_sheet(file_path, cscs_sheet, name_col, rules)
+    finally:
+        index.close()
+
+    os.replace(tmp_path, index_path)
+    return index_path
+
+
+def _csv_chn(value):
+    """
+    A CSV carries no cell types. A plain number is taken as the number
+    an extract stores it as; anything else, leading zeros included,
+    stays text.
+    """
+    text = value.strip()
+    if text.isdigit() and (text == "0" or not text.startswith("0")):
+        return int(text)
+    return value
+
+
+def load_delta(delta_path):
+    """
+    Read a CSCS delta file (.csv or .xlsx) into a list of change dicts.
+    Required columns: ACTION, CHN. ADD rows carry every CSCS column,
+    UPDATE rows carry MEMBERCODE.
+    """
+    csv = delta_path.lower().endswith(".csv")
+    if csv:
+        # Read as text so membercodes like 01234 keep their zeros
+        df = pd.read_csv(delta_path, dtype=str, keep_default_na=False).astype(object)
+        df = df.where(df != "", None)
+    else:
+        df = pd.read_excel(delta_path, engine="openpyxl", dtype=object)
+
+    df.columns = [str(c).strip() for c in df.columns]
+    for col in ("ACTION", "CHN"):
+        if col not in df.columns:
+            raise ValueError(f"Delta file missing column: {col}")
+
+    df = df.astype(object).where(df.notna(), None)
+    if csv:
+        df["CHN"] = df["CHN"].map(lambda v: None if v is None else _csv_chn(v))
+    return df.to_dict("records")
+
+
+def apply_cscs_delta(index_path, delta_path):
+    """
+    Apply a delta file to a persisted index.
+    Returns counts per action and the new index version.
+    """
+    if not os.path.exists(index_path):
+        raise FileNotFoundError(f"CSCS index not found: {index_path}")
+
+    changes = load_delta(delta_path)
+
+    index = DiskIndex(index_path)
+    try:
+        return index.apply_delta(changes)
+    finally:
+        index.close()
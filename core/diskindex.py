@@ -0,0 +1,467 @@
+# core/diskindex.py
+#
+# CSCS index that lives in an embedded database instead of Python dicts,
+# for extracts that do not fit in memory. DuckDB is used when installed,
+# SQLite otherwise. Matching runs as set-based joins and the final
+# decision is made by core.engine.decide, so results are identical
+# to match_row.
+#
+# Given an explicit path the index persists between runs and can be
+# refreshed in place with CSCS delta files (see core.delta).
+#
+# reconcile.py only uses this backend for a CSCS outside the IX TRAC
+# workbooks: those are loaded in full, so a CSCS sheet inside one would
+# be held as openpyxl cells regardless.
+
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import uuid
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from core.normalizer import normalize_name, first_two_names
+from core.engine import MatchDecision, decide
+from core.membercode_rules import MembercodeRules, VALID_COL, STATUS_COL
+from core.resources import setting, memory_budget_bytes
+from core.xlsxmeta import XlsxHeaders
+from config.rules import STATUS_NOT_FOUND
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+
+BACKEND_MEMORY = "memory"
+BACKEND_DISK = "disk"
+
+_LOAD_BATCH = 10_000
+
+_CSCS_COLUMNS = ["seq", "norm_name", "first2", "chn", "membercode", "valid", "terminal", "raw"]
+_QUERY_COLUMNS = ["row_id", "norm_name", "first2", "chn"]
+
+
+def chn_key(chn) -> str:
+    """
+    Text key for a CHN that keeps Python equality semantics:
+    123 and 123.0 are the same key, 123 and "123" are not.
+    """
+    if isinstance(chn, bool):
+        chn = int(chn)
+    if isinstance(chn, (int, float)):
+        if float(chn).is_integer():
+            return f"n:{int(chn)}"
+        return f"n:{chn!r}"
+    return f"s:{chn}"
+
+
+def chn_keys(chn) -> list:
+    """
+    Every key the same CHN may have been stored under: a CHN read from
+    text ("123") may be a number in the index and the other way round.
+    """
+    keys = [chn_key(chn)]
+    if isinstance(chn, str) and chn.strip().isdigit():
+        keys.append(chn_key(int(chn.strip())))
+    elif isinstance(chn, int) and not isinstance(chn, bool):
+        keys.append(chn_key(str(chn)))
+    return keys
+
+
+def _json_default(value):
+    return str(value)
+
+
+class DiskIndex:
+    def __init__(self, path=None, engine=None):
+        if engine is None and path is not None:
+            ext = os.path.splitext(path)[1].lstrip(".")
+            engine = ext if ext in ("duckdb", "sqlite") else None
+        if engine is None:
+            engine = "duckdb" if duckdb is not None else "sqlite"
+        if engine == "duckdb" and duckdb is None:
+            raise RuntimeError("DuckDB index requested but duckdb is not installed")
+        self.engine = engine
+
+        self._tmpdir = None
+        if path is None:
+            self._tmpdir = tempfile.mkdtemp(prefix="ixtrac_index_")
+            path = os.path.join(self._tmpdir, f"cscs.{engine}")
+        self.path = path
+
+        if engine == "duckdb":
+            self.conn = duckdb.connect(path)
+        else:
+            self.conn = sqlite3.connect(path)
+            if self._tmpdir:
+                # Throwaway index: durability is not needed
+                self.conn.execute("PRAGMA journal_mode=OFF")
+                self.conn.execute("PRAGMA synchronous=OFF")
+
+        self._create_schema()
+        self.columns = json.loads(self._meta("columns") or "[]")
+        self.name_col = self._meta("name_col") or "NAME"
+        self.rules = MembercodeRules(json.loads(self._meta("rules") or "null"))
+
+    def _create_schema(self):
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS cscs ("
+            " seq BIGINT,"
+            " norm_name TEXT,"
+            " first2 TEXT,"
+            " chn TEXT,"
+            " membercode TEXT,"
+            " valid BOOLEAN,"
+            " terminal TEXT,"
+            " raw TEXT)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS dup_counts ("
+            " norm_name TEXT, chn TEXT, n BIGINT)"
+        )
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT, value TEXT)"
+        )
+        self.conn.commit()
+
+    def _create_indexes(self):
+        self.conn.execute("CREATE INDEX IF NOT EXISTS ix_exact ON cscs (norm_name, chn)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS ix_first2 ON cscs (first2, chn)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS ix_chn ON cscs (chn)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS ix_dups ON dup_counts (norm_name, chn)")
+
+    # =================================================
+    # METADATA / VERSIONING
+    # =================================================
+    def _meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        self.conn.execute("DELETE FROM meta WHERE key = ?", (key,))
+        self.conn.execute("INSERT INTO meta VALUES (?, ?)", (key, str(value)))
+
+    @property
+    def version(self) -> int:
+        return int(self._meta("version") or 0)
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        Changes whenever the indexed CSCS content changes (rebuild or delta).
+        Caches derived from this index should key on it.
+        """
+        return f"{self._meta('build_id')}:{self.version}"
+
+    # =================================================
+    # LOAD
+    # =================================================
+    def load_sheet(self, file_path, sheet_name, name_col="NAME", rules=None):
+        """
+        Stream the CSCS sheet into the database without building a DataFrame.
+        """
+        wb = load_workbook(file_path, read_only=True, data_only=True)
+        try:
+            rows = wb[sheet_name].iter_rows(values_only=True)
+            header = [str(h).strip() if h is not None else f"UNNAMED:{i}"
+                      for i, h in enumerate(next(rows, ()))]
+
+            if name_col not in header:
+                raise ValueError("CSCS name column missing")
+
+            self.load_rows(header, rows, name_col, rules)
+        finally:
+            wb.close()
+
+    def _insert(self, first_seq, rows):
+        """
+        Insert a batch of raw CSCS rows, validating membercodes in one
+        vectorized pass over the batch.
+        """
+        width = len(self.columns)
+        rows = [list(row)[:width] + [None] * (width - len(row)) for row in rows]
+
+        name_i = self.columns.index(self.name_col)
+        chn_i = self.columns.index("CHN")
+        code_i = self.columns.index("MEMBERCODE")
+
+        codes = pd.Series([row[code_i] for row in rows], dtype=object)
+        validity = self.rules.evaluate(codes)
+
+        records = []
+        for i, (row, valid, terminal) in enumerate(zip(
+            rows, validity[VALID_COL], validity[STATUS_COL]
+        )):
+            name = row[name_i]
+            code = row[code_i]
+            records.append((
+                first_seq + i,
+                normalize_name(name),
+                first_two_names(name),
+                chn_key(row[chn_i]),
+                code if isinstance(code, str) else None,
+                bool(valid),
+                terminal,
+                json.dumps(row, default=_json_default),
+            ))
+
+        self._insert_many("cscs", _CSCS_COLUMNS, records)
+        return records
+
+    def _insert_many(self, table, columns, records):
+        """
+        Bulk insert. DuckDB is slow with executemany, so it reads the
+        batch from a registered DataFrame instead.
+        """
+        if not records:
+            return
+        if self.engine != "duckdb":
+            marks = ", ".join("?" for _ in columns)
+            self.conn.executemany(f"INSERT INTO {table} VALUES ({marks})", records)
+            return
+
+        self.conn.register("_batch", pd.DataFrame.from_records(records, columns=columns))
+        try:
+            self.conn.execute(f"INSERT INTO {table} SELECT * FROM _batch")
+        finally:
+            self.conn.unregister("_batch")
+
+    def load_rows(self, header, rows, name_col="NAME", rules=None):
+        self.columns = list(header)
+        self.name_col = name_col
+        self.rules = rules or MembercodeRules()
+
+        batch = []
+        seq = 0
+
+        for row in rows:
+            batch.append(row)
+
+            if len(batch) >= _LOAD_BATCH:
+                self._insert(seq, batch)
+                seq += len(batch)
+                batch = []
+
+        if batch:
+            self._insert(seq, batch)
+
+        self.conn.execute(
+            "INSERT INTO dup_counts"
+            " SELECT norm_name, chn, COUNT(*) FROM cscs"
+            " GROUP BY norm_name, chn HAVING COUNT(*) > 1"
+        )
+        self._create_indexes()
+
+        self._set_meta("columns", json.dumps(self.columns))
+        self._set_meta("name_col", name_col)
+        self._set_meta("rules", json.dumps(self.rules.specs))
+        self._set_meta("build_id", uuid.uuid4().hex)
+        self._set_meta("version", 1)
+        self.conn.commit()
+
+    # =================================================
+    # DELTA INGEST
+    # =================================================
+    def apply_delta(self, changes):
+        """
+        Apply CSCS changes in place and bump the index version.
+
+        Each change is a dict with ACTION (ADD, REMOVE or UPDATE) and CHN.
+        ADD carries a full CSCS row. REMOVE and UPDATE affect every row
+        with that CHN, whether stored as text or number, narrowed to
+        one holder when a name is given; UPDATE replaces MEMBERCODE.
+        REMOVE and UPDATE changes that match no row are listed under
+        UNMATCHED as (action, CHN, name).
+        """
+        counts = {"ADD": 0, "REMOVE": 0, "UPDATE": 0}
+        unmatched = []
+        touched = set()
+
+        row = self.conn.execute("SELECT MAX(seq) FROM cscs").fetchone()
+        next_seq = (row[0] if row and row[0] is not None else -1) + 1
+        code_i = self.columns.index("MEMBERCODE")
+
+        self.conn.execute("BEGIN")
+        try:
+            for change in changes:
+                action = str(change.get("ACTION") or "").strip().upper()
+                if action not in counts:
+                    raise ValueError(f"Unknown delta action: {change.get('ACTION')!r}")
+
+                chn = change.get("CHN")
+                name = change.get(self.name_col)
+
+                if action == "ADD":
+                    record = self._insert(next_seq, [[change.get(c) for c in self.columns]])[0]
+                    touched.add((record[1], record[3]))
+                    next_seq += 1
+                    counts[action] += 1
+                    continue
+
+                keys = chn_keys(chn)
+                where = f"chn IN ({', '.join('?' for _ in keys)})"
+                params = list(keys)
+                if name:
+                    where += " AND norm_name = ?"
+                    params.append(normalize_name(name))
+
+                affected = self.conn.execute(
+                    f"SELECT seq, norm_name, chn, raw FROM cscs WHERE {where}", params
+                ).fetchall()
+                if not affected:
+                    unmatched.append((action, chn, name))
+
+                for seq, norm, key, raw in affected:
+                    touched.add((norm, key))
+                    if action == "REMOVE":
+                        self.conn.execute("DELETE FROM cscs WHERE seq = ?", (seq,))
+                    else:
+                        code = change.get("MEMBERCODE")
+                        valid, terminal = self.rules(code)
+                        values = json.loads(raw)
+                        values[code_i] = code
+                        self.conn.execute(
+                            "UPDATE cscs SET membercode = ?, valid = ?, terminal = ?, raw = ?"
+                            " WHERE seq = ?",
+                            (
+                                code if isinstance(code, str) else None,
+                                valid,
+                                terminal,
+                                json.dumps(values, default=_json_default),
+                                seq,
+                            ),
+                        )
+                counts[action] += len(affected)
+
+            self._refresh_dup_counts(touched)
+            self._set_meta("version", self.version + 1)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+        counts["VERSION"] = self.version
+        counts["UNMATCHED"] = unmatched
+        return counts
+
+    def _refresh_dup_counts(self, keys):
+        for norm, chn in keys:
+            self.conn.execute(
+                "DELETE FROM dup_counts WHERE norm_name = ? AND chn = ?", (norm, chn)
+            )
+            n = self.conn.execute(
+                "SELECT COUNT(*) FROM cscs WHERE norm_name = ? AND chn = ?", (norm, chn)
+            ).fetchone()[0]
+            if n > 1:
+                self.conn.execute("INSERT INTO dup_counts VALUES (?, ?, ?)", (norm, chn, n))
+
+    # =================================================
+    # MATCH
+    # =================================================
+    def _candidates(self, key_col, precomputed):
+        cursor = self.conn.execute(
+            "SELECT q.row_id, c.membercode, c.valid, c.terminal"
+            " FROM q JOIN cscs c"
+            f" ON c.{key_col} = q.{key_col} AND c.chn = q.chn"
+            " ORDER BY q.row_id, c.seq"
+        )
+
+        found = {}
+        for row_id, code, valid, terminal in cursor.fetchall():
+            candidate = {"MEMBERCODE": code}
+            if precomputed:
+                candidate[VALID_COL] = valid
+                candidate[STATUS_COL] = terminal
+            found.setdefault(row_id, []).append(candidate)
+        return found
+
+    def match_many(self, pairs, rules=None):
+        """
+        Match a list of (name, chn) pairs. Returns one MatchDecision per pair.
+        Validity stored at load time is reused unless different rules are given.
+        """
+        batch_size = setting("DISK_INDEX_BATCH")
+        decisions = []
+
+        for start in range(0, len(pairs), batch_size):
+            decisions.extend(self._match_batch(pairs[start:start + batch_size], rules))
+
+        return decisions
+
+    def _match_batch(self, pairs, rules=None):
+        self.conn.execute("DROP TABLE IF EXISTS q")
+        self.conn.execute(
+            "CREATE TEMP TABLE q (row_id BIGINT, norm_name TEXT, first2 TEXT, chn TEXT)"
+        )
+
+        query = []
+        for i, (name, chn) in enumerate(pairs):
+            if name and chn:
+                query.append((i, normalize_name(name), first_two_names(name), chn_key(chn)))
+
+        self._insert_many("q", _QUERY_COLUMNS, query)
+
+        precomputed = rules is None or rules.key == self.rules.key
+        exact = self._candidates("norm_name", precomputed)
+        fallback = self._candidates("first2", precomputed)
+        self.conn.execute("DROP TABLE q")
+
+        decisions = []
+        for i, (name, chn) in enumerate(pairs):
+            if not name or not chn:
+                decisions.append(MatchDecision(None, STATUS_NOT_FOUND, "Missing name or CHN"))
+                continue
+            decisions.append(decide(exact.get(i, []), fallback.get(i, []), rules))
+
+        return decisions
+
+    # =================================================
+    # DUPLICATES
+    # =================================================
+    def duplicates(self) -> pd.DataFrame:
+        """
+        Same rows detect_duplicates(cscs, ["NORM_NAME", "CHN"]) returns.
+        """
+        cursor = self.conn.execute(
+            "SELECT c.raw, c.norm_name, c.first2 FROM cscs c"
+            " JOIN dup_counts d ON c.norm_name = d.norm_name AND c.chn = d.chn"
+            " ORDER BY c.seq"
+        )
+
+        records = [json.loads(raw) + [norm, first2] for raw, norm, first2 in cursor.fetchall()]
+        return pd.DataFrame(records, columns=self.columns + ["NORM_NAME", "FIRST2"])
+
+    def close(self):
+        self.conn.close()
+        if self._tmpdir:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+
+
+# =================================================
+# BACKEND SELECTION
+# =================================================
+def count_sheet_rows(file_path, sheet_name):
+    """
+    Data row count of a sheet, from its dimensions when the file records
+    them (no cell parsing), otherwise from a scan for row tags.
+    """
+    with XlsxHeaders(file_path) as wb:
+        return wb.read([sheet_name])[sheet_name].rows
+
+
+def choose_backend(file_path, sheet_name, estimate_bytes=None):
+    """
+    "memory" when the run fits the memory budget, "disk" otherwise.
+    Without an estimate (see core.preflight) only CSCS rows are counted.
+    """
+    backend = setting("INDEX_BACKEND")
+    if backend in (BACKEND_MEMORY, BACKEND_DISK):
+        return backend
+
+    if estimate_bytes is None:
+        estimate_bytes = count_sheet_rows(file_path, sheet_name) * setting("CSCS_BYTES_PER_ROW")
+    return BACKEND_MEMORY if estimate_bytes <= memory_budget_bytes() else BACKEND_DISK
@@ -5,6 +5,7 @@ from typing import Optional
 
 from core.normalizer import normalize_name, first_two_names
 from core.validator import validate_membercode
+from core.membercode_rules import VALID_COL, STATUS_COL
 from config.rules import (
     STATUS_CONFIRMED,
     STATUS_CONFIRMED_2NAME,
@@ -12,12 +13,17 @@ from config.rules import (
     STATUS_NOT_FOUND,
 )
 
+# Set on CSCS rows of a federated index (core.sources)
+SOURCE_COL = "SOURCE"
+SOURCE_RANK_COL = "SOURCE_RANK"
+
 
 @dataclass
 class MatchDecision:
     membercode: Optional[str]
     status: str
     reason: Optional[str] = None
+    source: Optional[str] = None
 
 
 def match_row(
@@ -25,6 +31,7 @@ def match_row(
     chn: str | None,
     exact_index: dict,
     two_name_index: dict,
+    rules=None,
 ) -> MatchDecision:
     """
     Core reconciliation decision engine.
@@ -35,42 +42,90 @@ def match_row(
         return MatchDecision(None, STATUS_NOT_FOUND, "Missing name or CHN")
 
     norm = normalize_name(name)
-    matches = exact_index.get((norm, chn), [])
+    first2 = first_two_names(name)
+
+    return decide(
+        exact_index.get((norm, chn), []),
+        two_name_index.get((first2, chn), []),
+        rules,
+    )
+
+
+def check_membercode(candidate, rules=None):
+    """
+    Use the validity precomputed on the indexed CSCS row when present,
+    otherwise validate now with the given rules (default: validate_membercode).
+    """
+    if VALID_COL in candidate:
+        return bool(candidate[VALID_COL]), candidate[STATUS_COL] or None
+    return (rules or validate_membercode)(candidate["MEMBERCODE"])
+
+
+def _source(candidate):
+    return candidate[SOURCE_COL] if SOURCE_COL in candidate else None
+
+
+def _by_precedence(valid):
+    """
+    Candidates from the highest-precedence source (lowest rank) among
+    several valid ones. Unranked candidates are returned unchanged.
+    """
+    if not all(SOURCE_RANK_COL in m for m in valid):
+        return valid
+    best = min(m[SOURCE_RANK_COL] for m in valid)
+    return [m for m in valid if m[SOURCE_RANK_COL] == best]
+
+
+def _resolve(valid, status, ambiguous_reason):
+    if len(valid) == 1:
+        return MatchDecision(valid[0]["MEMBERCODE"], status, source=_source(valid[0]))
+
+    preferred = _by_precedence(valid)
+    if len(preferred) == 1:
+        winner = _source(preferred[0])
+        others = sorted({str(_source(m)) for m in valid if _source(m) != winner})
+        return MatchDecision(
+            preferred[0]["MEMBERCODE"],
+            status,
+            f"Source precedence over {', '.join(others)}",
+            source=winner,
+        )
+
+    return MatchDecision(None, STATUS_AMBIGUOUS, ambiguous_reason)
+
+
+def decide(exact_matches: list, fallback_matches: list, rules=None) -> MatchDecision:
+    """
+    Decision rules applied to already-looked-up CSCS candidates.
+    Shared by match_row and the set-based disk index so both
+    backends produce identical decisions.
+    """
 
     valid = []
     invalid_reason = None
 
     # ---------- EXACT MATCH ----------
-    for m in matches:
-        ok, reason = validate_membercode(m["MEMBERCODE"])
+    for m in exact_matches:
+        ok, reason = check_membercode(m, rules)
         if ok:
             valid.append(m)
         elif invalid_reason is None:
             invalid_reason = reason
 
-    if len(valid) == 1:
-        return MatchDecision(valid[0]["MEMBERCODE"], STATUS_CONFIRMED)
-
-    if len(valid) > 1:
-        return MatchDecision(None, STATUS_AMBIGUOUS, "Multiple valid exact matches")
+    if valid:
+        return _resolve(valid, STATUS_CONFIRMED, "Multiple valid exact matches")
 
     if invalid_reason:
         return MatchDecision(None, STATUS_NOT_FOUND, invalid_reason)
 
     # ---------- FALLBACK: FIRST TWO NAMES ----------
-    first2 = first_two_names(name)
-    matches = two_name_index.get((first2, chn), [])
-
     valid = []
-    for m in matches:
-        ok, _ = validate_membercode(m["MEMBERCODE"])
+    for m in fallback_matches:
+        ok, _ = check_membercode(m, rules)
         if ok:
             valid.append(m)
 
-    if len(valid) == 1:
-        return MatchDecision(valid[0]["MEMBERCODE"], STATUS_CONFIRMED_2NAME)
-
-    if len(valid) > 1:
-        return MatchDecision(None, STATUS_AMBIGUOUS, "Multiple valid fallback matches")
+    if valid:
+        return _resolve(valid, STATUS_CONFIRMED_2NAME, "Multiple valid fallback matches")
 
     return MatchDecision(None, STATUS_NOT_FOUND, "No match found")
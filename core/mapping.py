@@ -1,3 +1,4 @@
+import fnmatch
 import json
 import os
 import tempfile
@@ -19,12 +20,36 @@ def _mapping_file_path():
     return os.path.join(base, "config", "mappings.json")
 
 
-def load_mappings():
-    path = _mapping_file_path()
+def load_mappings(path=None):
+    path = path or _mapping_file_path()
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
 
+def ixtrac_sheet_names(mapping, sheetnames):
+    """
+    IX TRAC sheets a mapping targets in a workbook, in workbook order.
+    "ixtrac_sheet" may be a sheet name, a glob pattern ("IX TRAC *")
+    or a list of either. The CSCS sheet is never a target.
+    """
+    spec = mapping["ixtrac_sheet"]
+    patterns = spec if isinstance(spec, list) else [spec]
+
+    targets = []
+    for pattern in patterns:
+        if any(ch in pattern for ch in "*?["):
+            matches = [s for s in sheetnames if fnmatch.fnmatchcase(s, pattern)]
+        else:
+            matches = [pattern] if pattern in sheetnames else []
+        for name in matches:
+            if name not in targets and name != mapping.get("cscs_sheet"):
+                targets.append(name)
+
+    if not targets:
+        raise MappingError(f"No IX TRAC sheet matching {spec!r} found in workbook.")
+    return targets
+
+
 def validate_mapping(sheet, mapping):
     headers = [cell.value for cell in sheet[1]]
     missing = [mapping["name"], mapping["chn"]]
@@ -1,4 +1,7 @@
 from core.normalizer import normalize_name, first_two_names
+from core.duplicates import detect_duplicates
+from core.membercode_rules import VALID_COL, STATUS_COL
+from core.engine import SOURCE_COL, SOURCE_RANK_COL
 
 def build_cscs_index(df):
     index = {}
@@ -13,3 +16,35 @@ def build_cscs_index_2name(df):
         key = (first_two_names(row["NAME"]), row["CHN"])
         index.setdefault(key, []).append(row)
     return index
+
+def prepare_cscs(cscs, name_col, rules):
+    """
+    Normalize, validate and index an in-memory CSCS frame.
+    Returns (exact_index, two_name_index, duplicates_df).
+    """
+    if name_col not in cscs.columns:
+        raise ValueError("CSCS name column missing")
+
+    # Positional index: validity is joined back on it below
+    cscs = cscs.reset_index(drop=True)
+    cscs["NORM_NAME"] = cscs[name_col].apply(normalize_name)
+    cscs["FIRST2"] = cscs[name_col].apply(first_two_names)
+
+    # Validate every membercode once; indexed rows carry the result
+    cscs = cscs.join(rules.evaluate(cscs["MEMBERCODE"]))
+
+    exact_index = build_cscs_index(cscs)
+    two_name_index = build_cscs_index_2name(cscs)
+
+    # In a federated index the same holder in two sources is expected;
+    # only duplicates within one source are reported
+    key = ["NORM_NAME", "CHN"]
+    if SOURCE_COL in cscs.columns:
+        key = [SOURCE_COL] + key
+
+    duplicates_df = detect_duplicates(
+        cscs,
+        key
+    ).drop(columns=[VALID_COL, STATUS_COL, SOURCE_RANK_COL], errors="ignore")
+
+    return exact_index, two_name_index, duplicates_df
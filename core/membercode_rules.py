@@ -0,0 +1,139 @@
+# core/membercode_rules.py
+#
+# Per-mapping membercode validation. A mapping may declare an ordered
+# list of rules in mappings.json:
+#
+#   "membercode_rules": [
+#       {"rule": "prefix", "values": ["RG"], "status": "POSITION IN CSCS"},
+#       {"rule": "max_length", "value": 5, "status": "MORE THAN 5"}
+#   ]
+#
+# The first failing rule decides the terminal status. Without the key
+# the defaults from config/rules.py apply, matching validate_membercode.
+# Rules are compiled once and evaluated over the whole CSCS membercode
+# column; results are stored per row so matching never re-validates.
+
+import json
+import re
+
+import pandas as pd
+
+from config.rules import (
+    MAX_MEMBERCODE_LENGTH,
+    INVALID_PREFIXES,
+    STATUS_POSITION_CSCS,
+    STATUS_MORE_THAN_5,
+)
+
+
+# Columns carrying the precomputed result on indexed CSCS rows
+VALID_COL = "MC_VALID"
+STATUS_COL = "MC_STATUS"
+
+DEFAULT_RULES = [
+    {"rule": "prefix", "values": list(INVALID_PREFIXES), "status": STATUS_POSITION_CSCS},
+    {"rule": "max_length", "value": MAX_MEMBERCODE_LENGTH, "status": STATUS_MORE_THAN_5},
+]
+
+
+class RuleError(Exception):
+    pass
+
+
+def _compile_rule(spec):
+    kind = spec.get("rule")
+
+    if kind in ("prefix", "suffix"):
+        values = spec.get("values")
+        if isinstance(values, str):
+            values = [values]
+        if not values:
+            raise RuleError(f"Rule '{kind}' needs a non-empty 'values' list")
+        values = tuple(values)
+        if kind == "prefix":
+            return (lambda s: s.str.startswith(values)), (lambda c: c.startswith(values))
+        return (lambda s: s.str.endswith(values)), (lambda c: c.endswith(values))
+
+    if kind in ("max_length", "min_length"):
+        limit = spec.get("value")
+        if not isinstance(limit, int):
+            raise RuleError(f"Rule '{kind}' needs an integer 'value'")
+        if kind == "max_length":
+            return (lambda s: s.str.len() > limit), (lambda c: len(c) > limit)
+        return (lambda s: s.str.len() < limit), (lambda c: len(c) < limit)
+
+    if kind == "pattern":
+        try:
+            regex = re.compile(spec.get("value") or "")
+        except re.error as e:
+            raise RuleError(f"Invalid pattern rule: {e}")
+        return (
+            lambda s: ~s.str.fullmatch(regex.pattern).astype(bool),
+            lambda c: regex.fullmatch(c) is None,
+        )
+
+    raise RuleError(f"Unknown membercode rule: {kind!r}")
+
+
+class MembercodeRules:
+    """
+    Compiled, ordered membercode rule list.
+    """
+
+    def __init__(self, specs=None):
+        self.specs = list(DEFAULT_RULES if specs is None else specs)
+        self.key = json.dumps(self.specs, sort_keys=True)
+        self._rules = [
+            (*_compile_rule(spec), spec.get("status"))
+            for spec in self.specs
+        ]
+
+    @property
+    def statuses(self):
+        return {status for *_, status in self._rules if status}
+
+    def __call__(self, code):
+        """
+        Scalar check. Returns (is_valid, terminal_status) like validate_membercode.
+        """
+        if not isinstance(code, str) or not code.strip():
+            return False, None
+
+        code = code.strip()
+        for _, fails, status in self._rules:
+            if fails(code):
+                return False, status
+
+        return True, None
+
+    def evaluate(self, codes: pd.Series) -> pd.DataFrame:
+        """
+        Vectorized check over a whole membercode column.
+        Returns a frame with VALID_COL and STATUS_COL aligned to `codes`.
+        """
+        is_str = codes.apply(isinstance, args=(str,)).astype(bool)
+        text = codes.where(is_str, "").astype(str).str.strip()
+
+        valid = is_str & (text != "")
+        status = pd.Series([None] * len(codes), index=codes.index, dtype=object)
+
+        for fails, _, rule_status in self._rules:
+            hit = valid & fails(text)
+            status[hit] = rule_status
+            valid &= ~hit
+
+        return pd.DataFrame({VALID_COL: valid, STATUS_COL: status})
+
+
+_compiled = {}
+
+
+def compile_rules(mapping=None) -> MembercodeRules:
+    """
+    Compiled rules for a mapping, cached so each rule list compiles once.
+    """
+    specs = (mapping or {}).get("membercode_rules")
+    key = json.dumps(specs, sort_keys=True)
+    if key not in _compiled:
+        _compiled[key] = MembercodeRules(specs)
+    return _compiled[key]
@@ -0,0 +1,460 @@
+# core/output.py
+#
+# Writing result tables to xlsx. Excel refuses sheets longer than
+# 1,048,576 rows, so longer tables are split: into companion workbooks
+# streamed to disk when an OutputShards is given (listed in an
+# OUTPUT_MANIFEST sheet and a JSON manifest), otherwise into extra
+# sheets of the same workbook.
+#
+# Saving takes a zip compression level (0 = store only) and can build
+# the XML of whole-table sheets in worker processes: tables handed over
+# as `deferred` frames are serialized in parallel, and only the zip
+# assembly runs in this process.
+
+import datetime
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from zipfile import ZipFile, ZIP_DEFLATED, ZIP_STORED
+
+import pandas as pd
+from xml.sax.saxutils import escape
+
+from openpyxl import Workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE, Cell
+from openpyxl.compat import safe_string
+from openpyxl.compat.numbers import NUMERIC_TYPES
+from openpyxl.drawing.spreadsheet_drawing import SpreadsheetDrawing
+from openpyxl.packaging.relationship import RelationshipList
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.dataframe import dataframe_to_rows
+from openpyxl.worksheet._writer import WorksheetWriter
+from openpyxl.worksheet.dimensions import SheetDimension
+from openpyxl.writer.excel import ExcelWriter
+
+from core.resources import setting
+
+MANIFEST_SHEET = "OUTPUT_MANIFEST"
+
+
+def _part_name(sheet_name, part):
+    if part == 1:
+        return sheet_name
+    suffix = f"_{part}"
+    return sheet_name[:31 - len(suffix)] + suffix
+
+
+def _fresh_sheet(wb, sheet_name):
+    if sheet_name in wb.sheetnames:
+        del wb[sheet_name]
+    return wb.create_sheet(sheet_name)
+
+
+class OutputShards:
+    """
+    Parts of over-long tables written next to `output_path` as
+    <stem>_<SHEET>_<n>.xlsx, one write-only workbook at a time, so at
+    most one part is ever buffered.
+    """
+
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self.manifest_path = f"{os.path.splitext(output_path)[0]}_MANIFEST.json"
+        self.parts = []
+        self._open = None
+        self._remove_previous()
+
+    def _remove_previous(self):
+        # Companions of an earlier run to the same path would otherwise
+        # linger beside a result that no longer needs them
+        if not os.path.exists(self.manifest_path):
+            return
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                previous = json.load(f)
+        except (OSError, ValueError):
+            previous = {"parts": []}
+
+        folder = os.path.dirname(os.path.abspath(self.output_path))
+        for part in previous.get("parts", []):
+            if part.get("PART", 1) > 1:
+                path = os.path.join(folder, os.path.basename(part["FILE"]))
+                if os.path.exists(path):
+                    os.remove(path)
+        os.remove(self.manifest_path)
+
+    def open_part(self, sheet_name, part, header):
+        self.close_part()
+        stem, ext = os.path.splitext(self.output_path)
+        path = f"{stem}_{sheet_name}_{part}{ext}"
+
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(sheet_name)
+        ws.append(header)
+        self._open = (wb, path)
+        return ws, os.path.basename(path)
+
+    def close_part(self):
+        if self._open is not None:
+            wb, path = self._open
+            save_workbook_atomic(wb, path)
+            self._open = None
+
+    def record(self, sheet_name, part, file_name, sheet_in_file, first_row, rows):
+        self.parts.append({
+            "SHEET": sheet_name,
+            "PART": part,
+            "FILE": file_name,
+            "SHEET_IN_FILE": sheet_in_file,
+            "FIRST_ROW": first_row,
+            "LAST_ROW": first_row + rows - 1,
+            "ROWS": rows,
+        })
+
+    def finish(self, wb):
+        """
+        Add the manifest sheet (with links to the companion workbooks)
+        and write <stem>_MANIFEST.json. Nothing is added when no table
+        had to be split.
+        """
+        self.close_part()
+        if not any(p["PART"] > 1 for p in self.parts):
+            return
+
+        ws = _fresh_sheet(wb, MANIFEST_SHEET)
+        columns = list(self.parts[0])
+        ws.append(columns)
+        for part in self.parts:
+            ws.append([part[c] for c in columns])
+            cell = ws.cell(ws.max_row, columns.index("FILE") + 1)
+            if part["FILE"] != os.path.basename(self.output_path):
+                cell.hyperlink = part["FILE"]
+                cell.style = "Hyperlink"
+
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"output": os.path.basename(self.output_path), "parts": self.parts},
+                f,
+                indent=2,
+            )
+        os.replace(tmp_path, self.manifest_path)
+
+
+def write_df_to_sheet(wb, sheet_name, df, shards=None, deferred=None):
+    """
+    Write a DataFrame to an openpyxl workbook, replacing any sheet
+    of the same name. Rows beyond the sheet limit continue in companion
+    workbooks when `shards` is given, else in sheets NAME_2, NAME_3, ...
+
+    With a `deferred` dict, sheets only get an empty placeholder now and
+    their rows (as frame slices) go in the dict; pass it to save_workbook
+    and they are rendered there, in parallel with other tables, without
+    ever becoming openpyxl cells.
+    """
+    per_part = setting("SHEET_MAX_ROWS") - 1
+
+    if deferred is not None:
+        _defer_df(wb, sheet_name, df, shards, deferred, per_part)
+        return
+
+    _drop_overflow(wb, sheet_name)
+
+    rows = dataframe_to_rows(df, index=False, header=True)
+    header = next(rows)
+
+    ws = _fresh_sheet(wb, sheet_name)
+    ws.append(header)
+    file_name = os.path.basename(shards.output_path) if shards else None
+    where = sheet_name
+    part = 1
+    count = 0
+    first_row = 1
+
+    for row in rows:
+        if count == per_part:
+            if shards is not None:
+                shards.record(sheet_name, part, file_name, where, first_row, count)
+            part += 1
+            first_row += count
+            count = 0
+            if shards is not None:
+                ws, file_name = shards.open_part(sheet_name, part, header)
+            else:
+                where = _part_name(sheet_name, part)
+                ws = _fresh_sheet(wb, where)
+                ws.append(header)
+        ws.append(row)
+        count += 1
+
+    if shards is not None:
+        shards.record(sheet_name, part, file_name, where, first_row, count)
+        shards.close_part()
+
+
+def _drop_overflow(wb, sheet_name):
+    # Overflow sheets left by an earlier, longer write
+    part = 2
+    while _part_name(sheet_name, part) in wb.sheetnames:
+        del wb[_part_name(sheet_name, part)]
+        part += 1
+
+
+def _defer_df(wb, sheet_name, df, shards, deferred, per_part):
+    _drop_overflow(wb, sheet_name)
+
+    file_name = os.path.basename(shards.output_path) if shards else None
+    header = list(df.columns)
+
+    for part, start in enumerate(range(0, max(len(df), 1), per_part), 1):
+        chunk = df.iloc[start:start + per_part]
+        if part == 1 or shards is None:
+            where = _part_name(sheet_name, part)
+            _fresh_sheet(wb, where)
+            deferred[where] = chunk
+        else:
+            # Companion workbooks are write-only: rows stream to disk
+            ws, file_name = shards.open_part(sheet_name, part, header)
+            where = sheet_name
+            for row in dataframe_to_rows(chunk, index=False, header=False):
+                ws.append(row)
+        if shards is not None:
+            shards.record(sheet_name, part, file_name, where, start + 1, len(chunk))
+
+    if shards is not None:
+        shards.close_part()
+
+
+def sheet_to_frame(ws) -> pd.DataFrame:
+    """
+    DataFrame of an in-memory openpyxl sheet (row 1 = headers), so results
+    never need to be re-read from the saved file.
+    """
+    rows = ws.values
+    header = next(rows, ())
+    columns = [
+        h if h is not None else f"Unnamed: {i}"
+        for i, h in enumerate(header)
+    ]
+    return pd.DataFrame(list(rows), columns=columns)
+
+
+# =================================================
+# SAVE
+# =================================================
+def _cell_xml(ref, value):
+    """
+    The <c> element openpyxl would write for a plain value, "" for an
+    empty cell, or None when the value needs openpyxl itself (dates and
+    other styled values, illegal characters, unknown types).
+    """
+    if value is None:
+        return ""
+    if value is True or value is False:
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, NUMERIC_TYPES):
+        # NaN and infinities are written as an empty value, like openpyxl
+        text = safe_string(value)
+        return f'<c r="{ref}" t="n"><v>{text}</v></c>' if text else f'<c r="{ref}" t="n"><v /></c>'
+    if isinstance(value, str):
+        if ILLEGAL_CHARACTERS_RE.search(value):
+            return None
+        space = ' xml:space="preserve"' if value.strip() and value != value.strip() else ""
+        return f'<c r="{ref}" t="inlineStr"><is><t{space}>{escape(value)}</t></is></c>'
+    return None
+
+
+def _sheet_xml(df, title):
+    """
+    Worksheet XML for a whole DataFrame. openpyxl writes strings inline,
+    so a sheet without styled cells stands on its own: the rows are
+    rendered straight from the frame (no cell objects) into the XML
+    openpyxl gives an empty sheet. Returns None when some value needs
+    openpyxl's own cell handling; the caller then writes the rows.
+    """
+    if not len(df.columns):
+        return None
+
+    rows = dataframe_to_rows(df, index=False, header=True)
+    letters = [get_column_letter(i + 1) for i in range(len(df.columns))]
+
+    parts = []
+    for r, row in enumerate(rows, 1):
+        cells = []
+        for letter, value in zip(letters, row):
+            xml = _cell_xml(f"{letter}{r}", value)
+            if xml is None:
+                return None
+            cells.append(xml)
+        parts.append(f'<row r="{r}">{"".join(cells)}</row>')
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = title
+    ws.sheet_view.tabSelected = None
+
+    writer = WorksheetWriter(ws)
+    writer.write()
+    try:
+        skeleton = writer.read().decode("utf-8")
+    finally:
+        writer.cleanup()
+
+    # Placeholders of openpyxl's empty-sheet XML; if a release ever
+    # writes them differently, let openpyxl write the rows itself
+    dimension = '<dimension ref="A1:A1" />'
+    sheet_data = "<sheetData></sheetData>"
+    if skeleton.count(dimension) != 1 or skeleton.count(sheet_data) != 1:
+        return None
+
+    skeleton = skeleton.replace(
+        dimension,
+        f'<dimension ref="A1:{letters[-1]}{len(df) + 1}" />',
+    )
+    return skeleton.replace(
+        sheet_data,
+        f"<sheetData>{''.join(parts)}</sheetData>",
+    ).encode("utf-8")
+
+
+def _serialize_frames(frames):
+    """
+    {title: xml or None}. Tables of PARALLEL_SAVE_MIN_ROWS rows or more
+    are serialized on a process pool when there are at least two.
+    """
+    threshold = setting("PARALLEL_SAVE_MIN_ROWS")
+    large = [title for title, df in frames.items() if len(df) >= threshold]
+    workers = min(len(large), os.cpu_count() or 1)
+
+    prebuilt = {}
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {title: pool.submit(_sheet_xml, frames[title], title) for title in large}
+            for title, df in frames.items():
+                if title not in futures:
+                    prebuilt[title] = _sheet_xml(df, title)
+            for title, future in futures.items():
+                prebuilt[title] = future.result()
+    else:
+        for title, df in frames.items():
+            prebuilt[title] = _sheet_xml(df, title)
+    return prebuilt
+
+
+class _FrameSheetWriter(WorksheetWriter):
+    """
+    WorksheetWriter for a placeholder sheet whose rows come from a
+    DataFrame. Cells are created one row at a time and dropped once
+    written, so tables with styled values (dates) stream too.
+    """
+
+    def __init__(self, ws, df):
+        self.df = df
+        super().__init__(ws)
+
+    def write_dimensions(self):
+        if not len(self.df.columns):
+            return super().write_dimensions()
+        ref = f"A1:{get_column_letter(len(self.df.columns))}{len(self.df) + 1}"
+        self.xf.send(SheetDimension(ref).to_tree())
+
+    def rows(self):
+        rows = dataframe_to_rows(self.df, index=False, header=True)
+        for r, values in enumerate(rows, 1):
+            yield r, [Cell(self.ws, row=r, column=c, value=v) for c, v in enumerate(values, 1)]
+
+
+class _PrebuiltSheetWriter(ExcelWriter):
+    """
+    ExcelWriter that stores ready-made XML for some worksheets, and
+    streams the rows of deferred frames that could not be prebuilt,
+    instead of generating them from their (empty placeholder) cells.
+    """
+
+    def __init__(self, workbook, archive, prebuilt, deferred):
+        super().__init__(workbook, archive)
+        self.prebuilt = prebuilt
+        self.deferred = deferred
+
+    def write_worksheet(self, ws):
+        xml = self.prebuilt.get(ws.title)
+        if xml is None and ws.title in self.deferred:
+            # Same steps as ExcelWriter.write_worksheet, rows from the frame
+            ws._drawing = SpreadsheetDrawing()
+            writer = _FrameSheetWriter(ws, self.deferred[ws.title])
+            writer.write()
+            ws._rels = writer._rels
+            self._archive.write(writer.out, ws.path[1:])
+            self.manifest.append(ws)
+            writer.cleanup()
+            return
+        if xml is None:
+            return super().write_worksheet(ws)
+
+        ws._drawing = None
+        ws._rels = RelationshipList()
+        self._archive.writestr(ws.path[1:], xml)
+        self.manifest.append(ws)
+
+
+def save_workbook(wb, target, compression=None, deferred=None):
+    """
+    wb.save() with a chosen zip compression level (0-9, 0 = store only;
+    default XLSX_COMPRESSION) and the deferred tables of
+    write_df_to_sheet serialized in parallel.
+    """
+    level = setting("XLSX_COMPRESSION") if compression is None else int(compression)
+
+    deferred = deferred or {}
+    prebuilt = _serialize_frames(deferred) if deferred else {}
+
+    archive = ZipFile(
+        target,
+        "w",
+        ZIP_DEFLATED if level else ZIP_STORED,
+        compresslevel=level or None,
+        allowZip64=True,
+    )
+    wb.properties.modified = datetime.datetime.now(tz=datetime.timezone.utc).replace(tzinfo=None)
+    _PrebuiltSheetWriter(wb, archive, prebuilt, deferred).save()
+
+
+def _umask_file_mode():
+    mask = os.umask(0)
+    os.umask(mask)
+    return 0o666 & ~mask
+
+
+_FILE_MODE = _umask_file_mode()
+
+
+def save_workbook_atomic(wb, path, retries=5, delay=1.0, compression=None, deferred=None):
+    """
+    Save an openpyxl workbook without ever leaving a half-written file
+    at `path`. The workbook is written to a temp file in the same folder
+    and swapped in; a target briefly locked (Excel, antivirus) is retried.
+    `compression` and `deferred` are passed on to save_workbook.
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".xlsx.tmp")
+    os.close(fd)
+    try:
+        save_workbook(wb, tmp_path, compression, deferred)
+        # mkstemp creates the file owner-only; give it the mode a plain save would
+        os.chmod(tmp_path, _FILE_MODE)
+
+        for attempt in range(retries):
+            try:
+                os.replace(tmp_path, path)
+                break
+            except PermissionError:
+                if attempt == retries - 1:
+                    raise
+                time.sleep(delay * (attempt + 1))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,193 @@
+# core/preflight.py
+#
+# Cheap checks before any full parse: only header rows, sheet dimensions
+# and a sample of CHN cells are read, straight from the archive (see
+# core.xlsxmeta). A wrong mapping fails here in well under a second
+# instead of after the whole workbook has been loaded.
+
+import json
+import os
+import statistics
+from collections import Counter
+from dataclasses import dataclass, field
+
+from core.mapping import MappingError, ixtrac_sheet_names
+from core.diskindex import BACKEND_MEMORY, choose_backend
+from core.resources import setting, memory_budget_bytes
+from core.sources import is_federated
+from core.xlsxmeta import XlsxHeaders
+
+CALIBRATION_PATH = "logs/calibration.json"
+
+_CHN_SAMPLE_ROWS = 200
+
+# Smaller runs are dominated by fixed start-up cost and skew per-row figures
+_MIN_CALIBRATION_ROWS = 10_000
+
+
+@dataclass
+class PreflightReport:
+    ixtrac_rows: int
+    cscs_rows: int
+    chn_types: dict = field(default_factory=dict)
+    warnings: list = field(default_factory=list)
+    estimated_peak_mb: float = 0.0
+    estimated_seconds: float = 0.0
+    backend: str = "memory"
+
+
+def _require(headers, sheet_name, columns):
+    for col in columns:
+        if col not in headers:
+            raise MappingError(
+                f"Required column '{col}' not found in sheet '{sheet_name}'.\n\n"
+                "Please ensure this column exists in row 1."
+            )
+
+
+# =================================================
+# CALIBRATION
+# =================================================
+def load_calibration():
+    if not os.path.exists(CALIBRATION_PATH):
+        return []
+    try:
+        with open(CALIBRATION_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def record_calibration(ixtrac_rows, cscs_rows, seconds, peak_bytes, backend):
+    """
+    Remember how a finished run behaved so later estimates improve.
+    """
+    runs = load_calibration()
+    runs.append({
+        "ixtrac_rows": ixtrac_rows,
+        "cscs_rows": cscs_rows,
+        "seconds": seconds,
+        "peak_bytes": peak_bytes,
+        "backend": backend,
+    })
+    runs = runs[-setting("CALIBRATION_RUNS"):]
+
+    os.makedirs(os.path.dirname(CALIBRATION_PATH), exist_ok=True)
+    tmp_path = CALIBRATION_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(runs, f, indent=2)
+    os.replace(tmp_path, CALIBRATION_PATH)
+
+
+def estimate(ixtrac_rows, cscs_rows):
+    """
+    (peak_bytes, seconds) for an in-memory run, from past runs when
+    available, otherwise from the defaults in config/settings.py.
+    """
+    rows = ixtrac_rows + cscs_rows
+    runs = [
+        r for r in load_calibration()
+        if r["ixtrac_rows"] + r["cscs_rows"] >= _MIN_CALIBRATION_ROWS
+    ]
+
+    seconds_per_row = setting("SECONDS_PER_ROW")
+    if runs:
+        seconds_per_row = statistics.median(
+            r["seconds"] / (r["ixtrac_rows"] + r["cscs_rows"]) for r in runs
+        )
+
+    memory_runs = [r for r in runs if r["backend"] == "memory" and r.get("peak_bytes")]
+    if memory_runs:
+        peak = rows * statistics.median(
+            r["peak_bytes"] / (r["ixtrac_rows"] + r["cscs_rows"]) for r in memory_runs
+        )
+    else:
+        peak = (
+            cscs_rows * setting("CSCS_BYTES_PER_ROW")
+            + ixtrac_rows * setting("IXTRAC_BYTES_PER_ROW")
+        )
+
+    return peak, rows * seconds_per_row
+
+
+# =================================================
+# PREFLIGHT
+# =================================================
+def _check_workbook(file_path, mapping, runs, cscs, report):
+    """
+    Check the IX TRAC targets and the CSCS sources (see core.sources)
+    of one workbook, adding their sizes and CHN types to the report.
+    `runs` is how often the workbook is reconciled, 0 for CSCS only.
+    """
+    with XlsxHeaders(file_path) as wb:
+        for source in cscs:
+            if source["sheet"] not in wb.sheetnames:
+                raise MappingError(f"Sheet '{source['sheet']}' not found in workbook.")
+
+        targets = ixtrac_sheet_names(mapping, wb.sheetnames) if runs else []
+        names = list(dict.fromkeys(targets + [source["sheet"] for source in cscs]))
+        sheets = wb.read(names, sample_rows=_CHN_SAMPLE_ROWS)
+
+    for sheet_name in targets:
+        sheet = sheets[sheet_name]
+        _require(sheet.headers, sheet_name, [mapping["name"], mapping["chn"]])
+
+        report.ixtrac_rows += sheet.rows * runs
+        report.chn_types["ixtrac"] += sheet.column_kinds(sheet.headers.index(mapping["chn"]))
+
+    for source in cscs:
+        sheet = sheets[source["sheet"]]
+        _require(sheet.headers, source["sheet"], [source["name_col"], "CHN", "MEMBERCODE"])
+
+        report.cscs_rows += sheet.rows
+        report.chn_types["cscs"] += sheet.column_kinds(sheet.headers.index("CHN"))
+
+
+def run_preflight(files, mapping, sources=None) -> PreflightReport:
+    """
+    Validate the mapping against header cells only and size up the run
+    over the IX TRAC workbooks and the CSCS sources (see core.sources;
+    None when the CSCS comes from a persisted index). Each workbook is
+    opened once. Raises MappingError for a missing sheet or column.
+    """
+    files = list(files)
+    cscs_by_file = {}
+    for source in sources or []:
+        cscs_by_file.setdefault(source["file"], []).append(source)
+
+    report = PreflightReport(ixtrac_rows=0, cscs_rows=0)
+    report.chn_types["ixtrac"] = Counter()
+    report.chn_types["cscs"] = Counter()
+
+    for path in dict.fromkeys(files + list(cscs_by_file)):
+        _check_workbook(path, mapping, files.count(path), cscs_by_file.get(path, []), report)
+
+    # CHN stored as numbers on one side and text on the other never matches
+    ix_kinds = set(report.chn_types["ixtrac"])
+    cscs_kinds = set(report.chn_types["cscs"])
+    if ix_kinds and cscs_kinds and not ix_kinds & cscs_kinds:
+        report.warnings.append(
+            f"CHN is stored as {'/'.join(sorted(ix_kinds))} in IX TRAC but as "
+            f"{'/'.join(sorted(cscs_kinds))} in CSCS; rows will not match."
+        )
+
+    peak, seconds = estimate(report.ixtrac_rows, report.cscs_rows)
+    report.estimated_peak_mb = peak / (1024 * 1024)
+    report.estimated_seconds = seconds
+
+    if sources and is_federated(sources):
+        report.backend = BACKEND_MEMORY
+        if peak > memory_budget_bytes():
+            report.warnings.append(
+                f"Estimated peak memory {report.estimated_peak_mb:.0f} MB exceeds the "
+                "budget; federated sources are still indexed in memory."
+            )
+    elif sources:
+        report.backend = choose_backend(sources[0]["file"], sources[0]["sheet"], estimate_bytes=peak)
+        if report.backend != BACKEND_MEMORY and peak > memory_budget_bytes():
+            report.warnings.append(
+                f"Estimated peak memory {report.estimated_peak_mb:.0f} MB exceeds the "
+                "budget; CSCS will be indexed on disk."
+            )
+
+    return report
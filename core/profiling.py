@@ -0,0 +1,187 @@
+# core/profiling.py
+#
+# Opt-in deep profiling for a reconciliation run. Enabled with the
+# IXTRAC_PROFILE environment variable, the --profile CLI flag or the
+# hidden GUI toggle (Ctrl+Shift+P). Writes, next to the output file:
+#
+#   <output>.prof         cProfile stats (snakeviz, pstats, ...)
+#   <output>.alloc.txt    tracemalloc top allocations per phase
+#   <output>.collapsed    sampled stacks, ready for flamegraph.pl / speedscope
+#
+# Allocation tracking depth is PROFILE_TRACEMALLOC_FRAMES in
+# config/settings.py (0 turns it off). When profiling is off,
+# mark_phase() is a no-op.
+
+import cProfile
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from core.resources import setting
+
+PROFILE_ENV = "IXTRAC_PROFILE"
+
+_TOP_ALLOCATIONS = 25
+_SAMPLE_INTERVAL = 0.005
+
+_active = threading.local()
+
+
+def profiling_enabled(flag=None) -> bool:
+    if flag is not None:
+        return bool(flag)
+    return os.environ.get(PROFILE_ENV, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def mark_phase(name):
+    """
+    Record a phase boundary on the profiler active in this thread, if any.
+    """
+    profiler = getattr(_active, "profiler", None)
+    if profiler is not None:
+        profiler.phase(name)
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class RunProfiler:
+    def __init__(self, output_path):
+        self.output_path = output_path
+        self.phases = []
+        self.stacks = Counter()
+
+        self._profile = cProfile.Profile()
+        self._thread_id = None
+        self._stop = threading.Event()
+        self._paused = threading.Event()
+        self._profiling = False
+        self._tracing = False
+        self._sampler = None
+        self._started = None
+
+    # =================================================
+    # LIFECYCLE
+    # =================================================
+    def __enter__(self):
+        self._thread_id = threading.get_ident()
+        self._started = time.perf_counter()
+        _active.profiler = self
+
+        frames = setting("PROFILE_TRACEMALLOC_FRAMES")
+        if frames:
+            tracemalloc.start(frames)
+            self._tracing = True
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+        self.phase("start")
+        self._profile.enable()
+        self._profiling = True
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._profile.disable()
+        self._profiling = False
+        self.phase("end" if exc_type is None else "failed")
+        self._stop.set()
+        self._sampler.join()
+        if self._tracing:
+            tracemalloc.stop()
+        _active.profiler = None
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.output_path)), exist_ok=True)
+        self._profile.dump_stats(self.output_path + ".prof")
+        self._write_allocations(self.output_path + ".alloc.txt")
+        self._write_collapsed(self.output_path + ".collapsed")
+        return False
+
+    # =================================================
+    # PHASES
+    # =================================================
+    def phase(self, name):
+        """
+        Record memory at a phase boundary. cProfile and the sampler are
+        paused meanwhile so the snapshot does not show up in either.
+        """
+        profiling = self._profiling
+        if profiling:
+            self._profile.disable()
+        self._paused.set()
+        try:
+            current, peak, snapshot = 0, 0, None
+            if self._tracing:
+                current, peak = tracemalloc.get_traced_memory()
+                snapshot = tracemalloc.take_snapshot()
+            self.phases.append({
+                "name": name,
+                "elapsed": time.perf_counter() - self._started,
+                "current": current,
+                "peak": peak,
+                "snapshot": snapshot,
+            })
+        finally:
+            self._paused.clear()
+            if profiling:
+                self._profile.enable()
+
+    # =================================================
+    # SAMPLER
+    # =================================================
+    def _sample(self):
+        while not self._stop.wait(_SAMPLE_INTERVAL):
+            if self._paused.is_set():
+                continue
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    # =================================================
+    # REPORTS
+    # =================================================
+    def _write_allocations(self, path):
+        mb = 1024 * 1024
+        lines = []
+        previous = None
+
+        for phase in self.phases:
+            if phase["snapshot"] is None:
+                lines.append(f"=== {phase['name']} @ {phase['elapsed']:.2f}s  (allocation tracking off)")
+                continue
+
+            lines.append(
+                f"=== {phase['name']} @ {phase['elapsed']:.2f}s"
+                f"  current={phase['current'] / mb:.1f} MB"
+                f"  peak={phase['peak'] / mb:.1f} MB"
+            )
+
+            snapshot = phase["snapshot"].filter_traces(
+                (tracemalloc.Filter(False, tracemalloc.__file__),)
+            )
+            if previous is None:
+                stats = snapshot.statistics("lineno")
+            else:
+                stats = snapshot.compare_to(previous, "lineno")
+                lines.append("  (growth since previous phase)")
+
+            for stat in stats[:_TOP_ALLOCATIONS]:
+                lines.append(f"  {stat}")
+
+            lines.append("")
+            previous = snapshot
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+
+    def _write_collapsed(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
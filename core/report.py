@@ -0,0 +1,111 @@
+# core/report.py
+#
+# Review, summary and decision-log tables shared by the workbook run
+# (reconcile.py) and the in-memory API (core.api).
+
+import pandas as pd
+
+from config.rules import STATUS_PRIORITY
+from core.status import resolve_display_status
+
+DECISION_COLUMNS = [
+    "ROW",
+    "NAME",
+    "CHN",
+    "STATUS",
+    "DISPLAY_STATUS",
+    "MEMBERCODE",
+    "REASON",
+    "SOURCE",
+]
+
+
+def decision_record(row, name, chn, decision, display_status):
+    return {
+        "ROW": row,
+        "NAME": name,
+        "CHN": chn,
+        "STATUS": decision.status,
+        "DISPLAY_STATUS": display_status,
+        "MEMBERCODE": decision.membercode,
+        "REASON": decision.reason,
+        "SOURCE": decision.source,
+    }
+
+
+def decide_rows(rows, match_chunk, statuses, done=None, record=None, chunk_size=None) -> list:
+    """
+    Decision-log records for (row, name, chn) tuples, `row` being the
+    worksheet row. `match_chunk` decides a list of (name, chn) pairs,
+    `chunk_size` rows at a time. Rows already in `done` (decisions by
+    row) are not matched again; each new decision goes to `record`.
+    """
+    done = dict(done or {})
+    pending = [row for row in rows if row[0] not in done]
+    chunk_size = chunk_size or len(pending) or 1
+
+    for start in range(0, len(pending), chunk_size):
+        chunk = pending[start:start + chunk_size]
+        chunk_decisions = match_chunk([(name, chn) for _, name, chn in chunk])
+
+        for (r, _, _), decision in zip(chunk, chunk_decisions):
+            done[r] = decision
+            if record is not None:
+                record(r, decision)
+
+    return [
+        decision_record(r, name, chn, done[r], resolve_display_status(done[r], statuses))
+        for r, name, chn in rows
+    ]
+
+
+def review_frame(ix_df, status_col) -> pd.DataFrame:
+    """
+    Enriched IX TRAC rows ordered by status priority.
+    """
+    review_df = ix_df.copy()
+    review_df["__rank"] = review_df[status_col].map(STATUS_PRIORITY)
+    return review_df.sort_values("__rank", kind="stable").drop(columns="__rank")
+
+
+def summary_frame(review_df, status_col) -> pd.DataFrame:
+    counts = review_df[status_col].value_counts()
+    summary_df = pd.DataFrame({
+        "STATUS": list(counts.index),
+        "COUNT": list(counts.values),
+    })
+
+    summary_df.loc[len(summary_df)] = {
+        "STATUS": "TOTAL_ROWS",
+        "COUNT": len(review_df),
+    }
+    return summary_df
+
+
+def combined_summary(summaries) -> pd.DataFrame:
+    """
+    Stack per-target summaries under a TARGET column and append the
+    totals over all targets as TARGET "ALL".
+    """
+    frames = []
+    for target, summary_df in summaries.items():
+        frame = summary_df.copy()
+        frame.insert(0, "TARGET", target)
+        frames.append(frame)
+
+    stacked = pd.concat(frames, ignore_index=True)
+    statuses = stacked[stacked["STATUS"] != "TOTAL_ROWS"]
+    totals = (
+        statuses.groupby("STATUS", sort=False)["COUNT"]
+        .sum()
+        .sort_values(ascending=False, kind="stable")
+    )
+
+    combined = pd.DataFrame({
+        "TARGET": "ALL",
+        "STATUS": list(totals.index) + ["TOTAL_ROWS"],
+        "COUNT": list(totals.values) + [
+            int(stacked.loc[stacked["STATUS"] == "TOTAL_ROWS", "COUNT"].sum())
+        ],
+    })
+    return pd.concat([stacked, combined], ignore_index=True)
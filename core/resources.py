@@ -0,0 +1,125 @@
+import ctypes
+import os
+import sys
+
+from config import settings
+
+
+def setting(name):
+    """
+    Read a runtime setting, letting IXTRAC_<NAME> override config/settings.py.
+    "none" or "off" sets a non-boolean setting to None.
+    """
+    default = getattr(settings, name)
+    raw = os.environ.get(f"IXTRAC_{name}")
+    if raw is None or raw == "":
+        return default
+    if isinstance(default, bool):
+        return raw.strip().lower() in ("1", "true", "yes", "on")
+    if raw.strip().lower() in ("none", "off"):
+        return None
+    if isinstance(default, int) or default is None:
+        try:
+            return int(raw)
+        except ValueError:
+            return raw
+    return raw
+
+
+def physical_memory_bytes():
+    """
+    Total physical memory, or None when it cannot be determined.
+    """
+    if sys.platform == "win32":
+        class MEMORYSTATUSEX(ctypes.Structure):
+            _fields_ = [
+                ("dwLength", ctypes.c_ulong),
+                ("dwMemoryLoad", ctypes.c_ulong),
+                ("ullTotalPhys", ctypes.c_ulonglong),
+                ("ullAvailPhys", ctypes.c_ulonglong),
+                ("ullTotalPageFile", ctypes.c_ulonglong),
+                ("ullAvailPageFile", ctypes.c_ulonglong),
+                ("ullTotalVirtual", ctypes.c_ulonglong),
+                ("ullAvailVirtual", ctypes.c_ulonglong),
+                ("ullAvailExtendedVirtual", ctypes.c_ulonglong),
+            ]
+
+        stat = MEMORYSTATUSEX()
+        stat.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+        if ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(stat)):
+            return stat.ullTotalPhys
+        return None
+
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def memory_budget_bytes():
+    budget_mb = setting("MEMORY_BUDGET_MB")
+    if budget_mb is not None:
+        return int(budget_mb) * 1024 * 1024
+
+    total = physical_memory_bytes()
+    if total is None:
+        return 2 * 1024 * 1024 * 1024
+    return total // 2
+
+
+def _process_memory_counters():
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ("cb", ctypes.c_ulong),
+            ("PageFaultCount", ctypes.c_ulong),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(PROCESS_MEMORY_COUNTERS)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    if ctypes.windll.psapi.GetProcessMemoryInfo(
+        process, ctypes.byref(counters), counters.cb
+    ):
+        return counters
+    return None
+
+
+def peak_rss_bytes():
+    """
+    Peak resident memory of this process so far, or None if unavailable.
+    """
+    if sys.platform == "win32":
+        counters = _process_memory_counters()
+        return counters.PeakWorkingSetSize if counters else None
+
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def rss_bytes():
+    """
+    Current resident memory of this process, or None if unavailable.
+    """
+    if sys.platform == "win32":
+        counters = _process_memory_counters()
+        return counters.WorkingSetSize if counters else None
+
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
@@ -0,0 +1,126 @@
+# core/signature.py
+#
+# Pick the mapping that fits a workbook from its sheet names and header
+# rows only (read straight from the archive by core.xlsxmeta, no full
+# parse). Saved mappings are turned into a signature index of the sheets
+# and columns each one needs, and a workbook's headers are scored
+# against every entry.
+
+from dataclasses import dataclass, field
+
+from core.mapping import MappingError, ixtrac_sheet_names
+from core.xlsxmeta import XlsxHeaders
+
+
+def read_signature(file_path):
+    """
+    {sheet name: [header, ...]} from row 1 of every sheet.
+    """
+    with XlsxHeaders(file_path) as wb:
+        sheets = wb.read(wb.worksheets, count_rows=False)
+    return {name: [h for h in sheet.headers if h] for name, sheet in sheets.items()}
+
+
+@dataclass
+class MappingMatch:
+    name: str
+    score: float
+    missing: list = field(default_factory=list)
+    matched: int = 0
+
+    @property
+    def fits(self) -> bool:
+        return not self.missing
+
+
+def _cscs_in_workbook(mapping):
+    # Federated sources that all name their own file need no CSCS sheet here
+    sources = mapping.get("cscs_sources")
+    return not sources or not all(s.get("file") for s in sources)
+
+
+class SignatureIndex:
+    """
+    Required sheets and columns of every saved mapping, ready to be
+    scored against workbook signatures.
+    """
+
+    def __init__(self, mappings):
+        self.entries = []
+        for name, mapping in mappings.items():
+            if not mapping.get("ixtrac_sheet"):
+                continue
+            cscs_columns = None
+            if _cscs_in_workbook(mapping):
+                if not mapping.get("cscs_sheet"):
+                    continue
+                cscs_columns = [mapping.get("cscs_name", "NAME"), "CHN", "MEMBERCODE"]
+            self.entries.append((
+                name,
+                mapping,
+                cscs_columns,
+                [mapping.get("name"), mapping.get("chn")],
+            ))
+
+    def _score(self, name, mapping, cscs_columns, ix_columns, signature):
+        found = 0
+        total = 1 + len(ix_columns)
+        missing = []
+
+        if cscs_columns is not None:
+            total += 1 + len(cscs_columns)
+            cscs_headers = signature.get(mapping["cscs_sheet"])
+            if cscs_headers is None:
+                missing.append(f"sheet '{mapping['cscs_sheet']}'")
+                cscs_headers = []
+            else:
+                found += 1
+            for col in cscs_columns:
+                if col in cscs_headers:
+                    found += 1
+                else:
+                    missing.append(f"CSCS column '{col}'")
+
+        try:
+            targets = ixtrac_sheet_names(mapping, list(signature))
+            found += 1
+        except MappingError:
+            missing.append(f"sheet '{mapping['ixtrac_sheet']}'")
+            targets = []
+        for col in ix_columns:
+            if targets and all(col in signature[sheet] for sheet in targets):
+                found += 1
+            else:
+                missing.append(f"IX TRAC column '{col}'")
+
+        return MappingMatch(name, found / total, missing, found)
+
+    def rank(self, signature):
+        """
+        Every mapping scored against a workbook signature, best first.
+        Equal scores go to the mapping that checked more of the workbook
+        (a federated mapping needing only IX TRAC columns loses to one
+        that also found the CSCS sheet), then keep mappings.json order.
+        """
+        matches = [self._score(*entry, signature) for entry in self.entries]
+        return sorted(matches, key=lambda m: (-m.score, -m.matched))
+
+
+def rank_mappings(file_path, mappings):
+    return SignatureIndex(mappings).rank(read_signature(file_path))
+
+
+def mapping_fits(mapping, signature):
+    ranked = SignatureIndex({"": mapping}).rank(signature)
+    return bool(ranked) and ranked[0].fits
+
+
+def detect_mapping(file_path, mappings):
+    """
+    Name of the best mapping whose sheets and required columns are all
+    present in the workbook, or None.
+    """
+    ranked = rank_mappings(file_path, mappings)
+    if ranked and ranked[0].fits:
+        return ranked[0].name
+    return None
@@ -0,0 +1,104 @@
+# core/sources.py
+#
+# Federated CSCS: a mapping may list several CSCS extracts (registrars,
+# depository snapshots) under "cscs_sources". They are loaded in parallel
+# and merged into one index whose rows carry their SOURCE and a
+# SOURCE_RANK; the engine uses the rank to settle matches that would
+# otherwise be AMBIGUOUS across sources.
+#
+#   "cscs_sources": [
+#       {"label": "REGISTRAR_A", "file": "a.xlsx", "sheet": "CSCS"},
+#       {"label": "SNAPSHOT_B", "file": "b.xlsx", "cscs_name": "HOLDER", "precedence": 1}
+#   ]
+#
+# Earlier entries win unless "precedence" is given (lower wins; equal
+# values leave the choice AMBIGUOUS). A missing "file" means the workbook
+# being reconciled; with no default file (core.api, core.daemon) those
+# sources are taken from sheets the caller already read.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from core.engine import SOURCE_COL, SOURCE_RANK_COL
+from core.loader import load_excel
+from core.mapping import MappingError
+
+
+def cscs_sources(mapping, default_file):
+    """
+    The mapping's CSCS sources as dicts with label, file, sheet, name_col
+    and rank. A mapping without "cscs_sources" has one unlabelled source.
+    Sources without a file get `default_file`, which may be None.
+    """
+    specs = mapping.get("cscs_sources")
+    if not specs:
+        return [{
+            "label": None,
+            "file": default_file,
+            "sheet": mapping["cscs_sheet"],
+            "name_col": mapping.get("cscs_name", "NAME"),
+            "rank": 0,
+        }]
+
+    sources = []
+    for i, spec in enumerate(specs):
+        label = spec.get("label") or f"SOURCE_{i + 1}"
+        if any(s["label"] == label for s in sources):
+            raise MappingError(f"Duplicate CSCS source label: {label}")
+        sources.append({
+            "label": label,
+            "file": spec.get("file") or default_file,
+            "sheet": spec.get("sheet") or mapping["cscs_sheet"],
+            "name_col": spec.get("cscs_name") or mapping.get("cscs_name", "NAME"),
+            "rank": spec.get("precedence", i),
+        })
+    return sources
+
+
+def is_federated(sources):
+    return sources[0]["label"] is not None
+
+
+def load_sources(sources, name_col="NAME", local=None) -> pd.DataFrame:
+    """
+    Read every source sheet (in parallel when there are several) and
+    stack them into one CSCS frame tagged with SOURCE and SOURCE_RANK.
+    Each source's name column is renamed to `name_col`.
+
+    Sources whose file is None come from `local`, the {sheet: DataFrame}
+    already read from the workbook being reconciled.
+    """
+    files = [s for s in sources if s["file"] is not None]
+    if len(files) == 1:
+        loaded = [load_excel(files[0]["file"], files[0]["sheet"])]
+    elif files:
+        workers = min(len(files), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            loaded = list(pool.map(
+                load_excel,
+                [s["file"] for s in files],
+                [s["sheet"] for s in files],
+            ))
+    else:
+        loaded = []
+    loaded = iter(loaded)
+
+    tagged = []
+    for source in sources:
+        if source["file"] is not None:
+            frame = next(loaded)
+        elif local is not None and source["sheet"] in local:
+            frame = local[source["sheet"]].copy()
+        else:
+            raise MappingError(f"CSCS sheet '{source['sheet']}' of source {source['label']} not found")
+
+        if source["name_col"] not in frame.columns:
+            raise ValueError(f"CSCS name column missing in source {source['label']}")
+        frame = frame.rename(columns={source["name_col"]: name_col})
+        frame[SOURCE_COL] = source["label"]
+        frame[SOURCE_RANK_COL] = source["rank"]
+        tagged.append(frame)
+
+    return pd.concat(tagged, ignore_index=True)
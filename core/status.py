@@ -3,9 +3,29 @@ from config.rules import (
     STATUS_CONFIRMED_2NAME,
     STATUS_AMBIGUOUS,
     STATUS_NOT_FOUND,
+    STATUS_POSITION_CSCS,
+    STATUS_MORE_THAN_5,
 )
 
 def assign_status(match_type, ambiguous=False):
     if ambiguous:
         return STATUS_AMBIGUOUS
     return STATUS_CONFIRMED if match_type == "EXACT" else STATUS_CONFIRMED_2NAME
+
+
+def resolve_display_status(decision, terminal_statuses=None):
+    """
+    Certain validation failures must be visible directly
+    in the MATCH_STATUS column.
+    """
+    if decision.reason == STATUS_POSITION_CSCS:
+        return STATUS_POSITION_CSCS
+
+    if decision.reason == STATUS_MORE_THAN_5:
+        return STATUS_MORE_THAN_5
+
+    # Statuses declared by the mapping's own membercode rules
+    if terminal_statuses and decision.reason in terminal_statuses:
+        return decision.reason
+
+    return decision.status
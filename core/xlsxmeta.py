@@ -0,0 +1,313 @@
+# core/xlsxmeta.py
+#
+# Sheet names, header rows and sizes read straight from an xlsx archive.
+# openpyxl parses the whole shared strings table on open, even read-only,
+# which takes seconds on large extracts. Here sheet XML is streamed only
+# as far as the rows asked for, row counts come from <dimension>, and
+# only the shared strings used by header cells are resolved.
+
+import html
+import posixpath
+import re
+import zipfile
+from collections import Counter
+from dataclasses import dataclass, field
+from xml.etree.ElementTree import iterparse
+
+_REL_WORKSHEET = "/worksheet"
+_REL_SHARED_STRINGS = "/sharedStrings"
+
+# Raw XML is scanned in chunks of this many bytes
+_CHUNK_SIZE = 1 << 20
+
+_CELL_REF = re.compile(r"([A-Z]+)(\d*)")
+_ROW_TAG = re.compile(rb"<(?:\w+:)?row\b([^>]*)>")
+_ROW_NUMBER = re.compile(rb'\br="(\d+)"')
+_STRING_START = re.compile(rb"(<(?:\w+:)?si)[\s/>]")
+_STRING_TEXT = re.compile(rb"<(?:\w+:)?t\b[^>]*?(?:/>|>(.*?)</(?:\w+:)?t>)", re.S)
+_PHONETIC = re.compile(rb"<(?:\w+:)?rPh\b.*?</(?:\w+:)?rPh>", re.S)
+
+
+@dataclass
+class SheetHeader:
+    headers: list
+    rows: int = None
+    # One {column index: "number" | "text"} per sampled data row
+    samples: list = field(default_factory=list)
+
+    def column_kinds(self, col) -> Counter:
+        return Counter(row[col] for row in self.samples if col in row)
+
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _column(ref):
+    """
+    Zero-based column index of a cell reference like "AB12".
+    """
+    letters = _CELL_REF.match(ref).group(1)
+    index = 0
+    for ch in letters:
+        index = index * 26 + ord(ch) - 64
+    return index - 1
+
+
+def _rels(archive, part):
+    """
+    {relationship id: (type, member path)} for an archive part.
+    """
+    folder, name = posixpath.split(part)
+    path = posixpath.join(folder, "_rels", name + ".rels")
+    if path not in archive.namelist():
+        return {}
+
+    rels = {}
+    for _, elem in iterparse(archive.open(path)):
+        if _local(elem.tag) == "Relationship":
+            target = elem.get("Target", "")
+            if target.startswith("/"):
+                target = target.lstrip("/")
+            else:
+                target = posixpath.normpath(posixpath.join(folder, target))
+            rels[elem.get("Id")] = (elem.get("Type", ""), target)
+    return rels
+
+
+def _inline_text(elem):
+    # Rich text runs are joined; phonetic hints (rPh) are not part of the value
+    parts = []
+    for child in elem:
+        tag = _local(child.tag)
+        if tag == "t":
+            parts.append(child.text or "")
+        elif tag == "r":
+            parts.extend(t.text or "" for t in child if _local(t.tag) == "t")
+    return "".join(parts)
+
+
+def _number(text):
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+class XlsxHeaders:
+    """
+    An xlsx workbook opened once for several header reads.
+    """
+
+    def __init__(self, file_path):
+        self.archive = zipfile.ZipFile(file_path)
+        try:
+            workbook = next(
+                target for kind, target in _rels(self.archive, "").values()
+                if kind.endswith("/officeDocument")
+            )
+            rels = _rels(self.archive, workbook)
+
+            self._parts = {}
+            self.worksheets = []
+            for _, elem in iterparse(self.archive.open(workbook)):
+                if _local(elem.tag) != "sheet":
+                    continue
+                rid = next((v for k, v in elem.attrib.items() if _local(k) == "id"), None)
+                kind, target = rels.get(rid, ("", None))
+                name = elem.get("name")
+                self._parts[name] = target
+                if kind.endswith(_REL_WORKSHEET):
+                    self.worksheets.append(name)
+            self.sheetnames = list(self._parts)
+
+            self._shared_strings = next(
+                (target for kind, target in rels.values() if kind.endswith(_REL_SHARED_STRINGS)),
+                None,
+            )
+        except Exception:
+            self.archive.close()
+            raise
+
+    def close(self):
+        self.archive.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    # =================================================
+    # SHEETS
+    # =================================================
+    def read(self, sheet_names, sample_rows=0, count_rows=True) -> dict:
+        """
+        {sheet name: SheetHeader} with row 1 as text ("" for blank
+        cells), the data row count (None unless `count_rows`) and the
+        value kinds of up to `sample_rows` rows below the header.
+        """
+        raw = {name: self._read_sheet(name, sample_rows, count_rows) for name in sheet_names}
+
+        wanted = {value for header, _, _ in raw.values() for kind, value in header if kind == "s"}
+        strings = self._strings(wanted)
+
+        sheets = {}
+        for name, (header, rows, samples) in raw.items():
+            headers = []
+            for kind, value in header:
+                if kind == "s":
+                    value = strings.get(value)
+                headers.append(str(value).strip() if value is not None else "")
+            sheets[name] = SheetHeader(headers, rows, samples)
+        return sheets
+
+    def _read_sheet(self, name, sample_rows, count_rows):
+        part = self._parts.get(name)
+        if part is None:
+            raise KeyError(f"Worksheet {name} does not exist.")
+
+        header = []
+        samples = []
+        max_row = None
+        last_row = 0
+        parent = None
+
+        for event, elem in iterparse(self.archive.open(part), events=("start", "end")):
+            tag = _local(elem.tag)
+            if event == "start":
+                if tag == "sheetData":
+                    parent = elem
+                elif tag == "dimension":
+                    end = elem.get("ref", "").split(":")[-1]
+                    digits = _CELL_REF.match(end).group(2) if end else ""
+                    max_row = int(digits) if digits else None
+                continue
+            if tag != "row":
+                continue
+
+            last_row = int(elem.get("r") or last_row + 1)
+            if last_row == 1:
+                header = self._cells(elem, values=True)
+            elif last_row <= sample_rows + 1:
+                cells = enumerate(self._cells(elem))
+                samples.append({col: kind for col, (kind, _) in cells if kind is not None})
+            parent.clear()
+
+            if last_row >= sample_rows + 1:
+                break
+
+        if not count_rows:
+            return header, None, samples
+        if max_row is None:
+            max_row = self._last_row(part)
+        return header, max(max_row - 1, 0), samples
+
+    def _last_row(self, part):
+        """
+        Last row number of a sheet written without <dimension>, from a
+        scan of the raw XML for row tags; no cells are parsed.
+        """
+        last = 0
+        tail = b""
+        with self.archive.open(part) as f:
+            while True:
+                chunk = f.read(_CHUNK_SIZE)
+                data = tail + chunk
+                # Hold back a tag cut off at the chunk boundary
+                cut = data.rfind(b"<")
+                if chunk and cut != -1 and data.find(b">", cut) == -1:
+                    data, tail = data[:cut], data[cut:]
+                else:
+                    tail = b""
+                for match in _ROW_TAG.finditer(data):
+                    number = _ROW_NUMBER.search(match.group(1))
+                    last = int(number.group(1)) if number else last + 1
+                if not chunk:
+                    return last
+
+    def _cells(self, row, values=False):
+        """
+        [(kind, value)] by column for one <row>. Kinds are "s" (shared
+        string index, resolved later), "text" and "number"; blanks are None.
+        """
+        cells = []
+        for c in row:
+            if _local(c.tag) != "c":
+                continue
+            ref = c.get("r")
+            col = _column(ref) if ref else len(cells)
+            cells.extend([None] * (col - len(cells) + 1))
+
+            t = c.get("t", "n")
+            if t == "inlineStr":
+                inline = next((e for e in c if _local(e.tag) == "is"), None)
+                cells[col] = ("text", _inline_text(inline)) if inline is not None else None
+                continue
+
+            v = next((e.text for e in c if _local(e.tag) == "v"), None)
+            if v is None:
+                continue
+            if t == "s":
+                cells[col] = ("s", int(v)) if values else ("text", None)
+            elif t == "n":
+                cells[col] = ("number", _number(v) if values else None)
+            elif t == "b":
+                cells[col] = ("number", v == "1")
+            else:
+                cells[col] = ("text", v)
+        return [cell if cell is not None else (None, None) for cell in cells]
+
+    def _strings(self, wanted):
+        """
+        {index: text} for the shared strings in `wanted`. The table is
+        scanned as raw XML no further than the highest index needed;
+        items are counted, and only the wanted ones decoded.
+        """
+        if not wanted or self._shared_strings is None:
+            return {}
+
+        last = max(wanted)
+        strings = {}
+        index = 0
+        tail = b""
+        start_tags = None
+        with self.archive.open(self._shared_strings) as f:
+            while index <= last:
+                chunk = f.read(_CHUNK_SIZE)
+                data = tail + chunk
+                if start_tags is None:
+                    first = _STRING_START.search(data)
+                    if first is None:
+                        tail = data
+                        if not chunk:
+                            break
+                        continue
+                    # "<si" or a prefixed "<x:si", the same for the whole table
+                    start_tags = [first.group(1) + end for end in (b">", b"/", b" ", b"\t", b"\r", b"\n")]
+
+                # Hold back the last item; it may continue in the next chunk
+                cut = max(data.rfind(tag) for tag in start_tags) if chunk else len(data)
+                if cut <= 0:
+                    tail = data
+                    continue
+                body, tail = data[:cut], data[cut:]
+
+                count = sum(body.count(tag) for tag in start_tags)
+                if any(index <= i < index + count for i in wanted):
+                    starts = [m.start() for m in _STRING_START.finditer(body)]
+                    for n, pos in enumerate(starts):
+                        if index + n in wanted:
+                            end = starts[n + 1] if n + 1 < len(starts) else len(body)
+                            strings[index + n] = _item_text(body[pos:end])
+                index += count
+                if not chunk:
+                    break
+        return strings
+
+
+def _item_text(body):
+    # Rich text runs are joined; phonetic hints (rPh) are not part of the value
+    runs = _STRING_TEXT.finditer(_PHONETIC.sub(b"", body))
+    return "".join(html.unescape((m.group(1) or b"").decode("utf-8")) for m in runs)
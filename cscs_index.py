@@ -0,0 +1,79 @@
+# cscs_index.py
+
+import argparse
+import os
+
+from core.delta import apply_cscs_delta, build_index
+from core.diskindex import DiskIndex
+from core.mapping import load_mappings
+from core.membercode_rules import compile_rules
+
+
+def _build(args, parser):
+    mapping = {}
+    if args.mapping:
+        mappings = load_mappings()
+        if args.mapping not in mappings:
+            parser.error(f"Unknown mapping: {args.mapping}")
+        mapping = mappings[args.mapping]
+
+    sheet = args.sheet or mapping.get("cscs_sheet") or "CSCS"
+    name_col = args.name_col or mapping.get("cscs_name", "NAME")
+
+    build_index(args.file, sheet, args.index, name_col, compile_rules(mapping))
+    _info(args.index)
+
+
+def _apply(args):
+    counts = apply_cscs_delta(args.index, args.delta)
+    print(
+        f"✔ {counts['ADD']} added, {counts['REMOVE']} removed, {counts['UPDATE']} updated "
+        f"→ version {counts['VERSION']}"
+    )
+    for action, chn, name in counts["UNMATCHED"]:
+        holder = f" ({name})" if name else ""
+        print(f"⚠ {action} CHN {chn}{holder} matched no CSCS row")
+
+
+def _info(index_path):
+    index = DiskIndex(index_path)
+    try:
+        rows = index.conn.execute("SELECT COUNT(*) FROM cscs").fetchone()[0]
+        print(f"✔ {index_path}: {rows} CSCS rows, version {index.version} ({index.engine})")
+    finally:
+        index.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and refresh a persisted CSCS index")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Build an index from a full CSCS extract")
+    build.add_argument("file", help="Workbook holding the CSCS sheet")
+    build.add_argument("index", help="Index to create (.sqlite or .duckdb)")
+    build.add_argument("--mapping", help="Take the CSCS sheet, name column and membercode rules from this mapping")
+    build.add_argument("--sheet", help="CSCS sheet (default: the mapping's, else CSCS)")
+    build.add_argument("--name-col", help="CSCS name column (default: the mapping's, else NAME)")
+
+    apply = commands.add_parser("apply", help="Apply a CSCS delta file (.csv or .xlsx) in place")
+    apply.add_argument("index", help="Index to update")
+    apply.add_argument("delta", help="Delta file with ACTION and CHN columns")
+
+    info = commands.add_parser("info", help="Show an index's size and version")
+    info.add_argument("index")
+
+    args = parser.parse_args()
+
+    if args.command != "build" and not os.path.exists(args.index):
+        parser.error(f"No CSCS index at {args.index}")
+
+    if args.command == "build":
+        _build(args, parser)
+    elif args.command == "apply":
+        _apply(args)
+    else:
+        _info(args.index)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+# daemon.py
+
+import argparse
+import multiprocessing
+import signal
+
+from core.daemon import InboxDaemon
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile workbooks dropped in a watched folder")
+    parser.add_argument("--inbox", default="inbox", help="Folder to watch for .xlsx files")
+    parser.add_argument("--outbox", default="outbox", help="Where processed inputs and results go")
+    parser.add_argument("--errors", default="errors", help="Where failed inputs go")
+    parser.add_argument("--workers", type=int, default=2, help="Worker processes")
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="Seconds between scans")
+    parser.add_argument("--mappings", help="mappings.json to use instead of config/mappings.json")
+    args = parser.parse_args()
+
+    daemon = InboxDaemon(
+        args.inbox,
+        args.outbox,
+        args.errors,
+        workers=args.workers,
+        poll_interval=args.poll_interval,
+        mappings_path=args.mappings,
+    )
+    signal.signal(signal.SIGTERM, lambda *_: daemon.stop())
+
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        daemon.stop()
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
@@ -0,0 +1,60 @@
+# decisions.py
+
+import argparse
+import os
+
+import pandas as pd
+
+from core.decision_store import DecisionStore
+from core.resources import setting
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Look up decisions from past reconciliation runs")
+    parser.add_argument("--store", default=setting("DECISION_STORE"), help="Decision store database")
+    parser.add_argument("--name", help="Holder name (matched after normalization)")
+    parser.add_argument("--chn", help="CHN")
+    parser.add_argument("--membercode", help="Membercode")
+    parser.add_argument("--mapping", help="Only runs made with this mapping")
+    parser.add_argument("--since", help="Only runs recorded on or after this date (YYYY-MM-DD)")
+    parser.add_argument("--limit", type=int, default=50, help="Maximum rows to show (0 = all)")
+    parser.add_argument("--runs", action="store_true", help="List recorded runs instead")
+    parser.add_argument("--export", help="Write the result to a .csv or .xlsx file")
+    args = parser.parse_args()
+
+    if not args.store or not os.path.exists(args.store):
+        parser.error(f"No decision store at {args.store}")
+
+    store = DecisionStore(args.store)
+    try:
+        if args.runs:
+            result = store.runs(limit=args.limit)
+        else:
+            result = store.query(
+                name=args.name,
+                chn=args.chn,
+                membercode=args.membercode,
+                mapping_name=args.mapping,
+                since=args.since,
+                limit=args.limit,
+            )
+    finally:
+        store.close()
+
+    if args.export:
+        if args.export.lower().endswith(".csv"):
+            result.to_csv(args.export, index=False)
+        else:
+            result.to_excel(args.export, index=False)
+        print(f"✔ {len(result)} rows written to {args.export}")
+        return
+
+    if result.empty:
+        print("No matching decisions")
+        return
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(result.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
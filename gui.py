@@ -1,11 +1,14 @@
+import multiprocessing
 import os
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk
 from tkinter import filedialog, messagebox
 from tkinterdnd2 import DND_FILES, TkinterDnD
 
 from reconcile import run_reconciliation
-from core.mapping import load_mappings
+from core.mapping import load_mappings, MappingError
+from core.signature import rank_mappings
 from wizard.wizard import MappingWizard
 
 
@@ -36,6 +39,7 @@ class App:
         self.root = root
 
         self.file_path = tk.StringVar(master=root)
+        self.profile = tk.BooleanVar(master=root, value=False)
         self.mappings = load_mappings()
         self.mapping_choice = tk.StringVar(
             master=root,
@@ -56,7 +60,14 @@ class App:
 
         ttk.Label(card, text="Select Template", style="Subtitle.TLabel").pack(anchor="w")
         self.mapping_menu = ttk.Combobox(card, textvariable=self.mapping_choice, values=list(self.mappings.keys()), state="readonly", width=38)
-        self.mapping_menu.pack(anchor="w", pady=(5, 10))
+        self.mapping_menu.pack(anchor="w", pady=(5, 0))
+
+        self.detected = tk.StringVar(master=root)
+        # Headers are read off the Tk thread; only the latest file counts
+        self._readers = ThreadPoolExecutor(max_workers=1)
+        self._detection = None
+        ttk.Label(card, textvariable=self.detected, style="Subtitle.TLabel").pack(anchor="w", pady=(2, 10))
+        self.file_path.trace_add("write", self.detect_mapping)
 
         ttk.Button(card, text="Add New File Format", command=self.open_mapping_wizard).pack(anchor="w", pady=(0, 15))
 
@@ -74,6 +85,9 @@ class App:
         root.drop_target_register(DND_FILES)
         root.dnd_bind("<<Drop>>", self.drop)
 
+        # Hidden: profile the next runs (for performance reports)
+        root.bind("<Control-Shift-P>", self.toggle_profiling)
+
     def browse(self):
         f = filedialog.askopenfilename(parent=self.root, filetypes=[("Excel files", "*.xlsx")])
         if f:
@@ -84,6 +98,46 @@ class App:
         if f.lower().endswith(".xlsx") and os.path.exists(f):
             self.file_path.set(f)
 
+    def detect_mapping(self, *args):
+        """
+        Pre-select the saved mapping that fits the chosen file
+        (sheet names and header rows only, read on a worker thread).
+        """
+        path = self.file_path.get()
+        if not path.lower().endswith(".xlsx") or not os.path.exists(path):
+            self._detection = None
+            self.detected.set("")
+            return
+
+        self.detected.set("Reading file…")
+        self._detection = self._readers.submit(rank_mappings, path, self.mappings)
+        self._show_detection(self._detection)
+
+    def _show_detection(self, detection):
+        if detection is not self._detection:
+            # Another file was chosen meanwhile
+            return
+        if not detection.done():
+            self.root.after(50, self._show_detection, detection)
+            return
+
+        try:
+            ranked = detection.result()
+        except Exception:
+            self.detected.set("")
+            return
+
+        if ranked and ranked[0].fits:
+            self.mapping_choice.set(ranked[0].name)
+            self.detected.set(f"Detected: {ranked[0].name}")
+        else:
+            self.detected.set("No saved template fits this file. Use Add New File Format.")
+
+    def toggle_profiling(self, event=None):
+        self.profile.set(not self.profile.get())
+        title = "IX TRAC Reconciler"
+        self.root.title(f"{title} [profiling]" if self.profile.get() else title)
+
     def open_mapping_wizard(self):
         wizard = MappingWizard(self.root)
         self.root.wait_window(wizard)
@@ -95,14 +149,26 @@ class App:
         self.mapping_menu["values"] = values
         if values:
             self.mapping_choice.set(values[0])
+        self.detect_mapping()
 
     def run(self):
         if not os.path.exists(self.file_path.get()):
             messagebox.showerror("Error", "Invalid Excel file.", parent=self.root)
             return
-        run_reconciliation(self.file_path.get(), self.mapping_choice.get())
+        try:
+            run_reconciliation(
+                self.file_path.get(),
+                self.mapping_choice.get(),
+                profile=self.profile.get() or None,
+            )
+        except MappingError as e:
+            # Raised by the preflight check before the workbook is parsed
+            messagebox.showerror("Mapping does not fit this file", str(e), parent=self.root)
+            return
         messagebox.showinfo("Success", "Reconciliation completed.", parent=self.root)
 
 
 if __name__ == "__main__":
+    # Federated CSCS sources load in worker processes (packaged exe too)
+    multiprocessing.freeze_support()
     main()
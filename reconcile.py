@@ -1,162 +1,489 @@
 # reconcile.py
 
+import argparse
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import pandas as pd
-from openpyxl import load_workbook
-from openpyxl.utils.dataframe import dataframe_to_rows
+from openpyxl import Workbook, load_workbook
 
 from core.loader import load_excel
-from core.normalizer import normalize_name, first_two_names
-from core.matcher import build_cscs_index, build_cscs_index_2name
-from core.mapping import load_mappings, validate_mapping, resolve_columns
+from core.matcher import prepare_cscs
+from core.mapping import (
+    MappingError,
+    load_mappings,
+    validate_mapping,
+    resolve_columns,
+    ixtrac_sheet_names,
+)
 from core.engine import match_row
-from core.duplicates import detect_duplicates
+from core.diskindex import DiskIndex, BACKEND_DISK
+from core.membercode_rules import compile_rules
+from core.profiling import RunProfiler, profiling_enabled, mark_phase
+from core.checkpoint import Checkpoint, checkpoint_key, file_fingerprint, frame_fingerprint
+from core.output import OutputShards, save_workbook_atomic, write_df_to_sheet, sheet_to_frame
+from core.report import decide_rows, review_frame, summary_frame, combined_summary
+from core.resources import setting, peak_rss_bytes, rss_bytes
+from core.preflight import run_preflight, record_calibration
+from core.decision_store import DecisionStore, cache_key
+from core.signature import rank_mappings
+from core.sources import cscs_sources, is_federated, load_sources
 
-from config.rules import (
-    STATUS_PRIORITY,
-    STATUS_POSITION_CSCS,
-    STATUS_MORE_THAN_5,
-)
 
 
 # =================================================
-# Helper: write DataFrame to openpyxl workbook safely
+# Main reconciliation entry point
 # =================================================
-def write_df_to_sheet(wb, sheet_name, df):
-    if sheet_name in wb.sheetnames:
-        del wb[sheet_name]
-    ws = wb.create_sheet(sheet_name)
-    for row in dataframe_to_rows(df, index=False, header=True):
-        ws.append(row)
+OUTPUT_PATH = "output/IXTRAC_RECONCILED.xlsx"
+
+
+def run_reconciliation(
+    file_path: str | list[str],
+    mapping_name: str,
+    backend: str | None = None,
+    cscs_index: str | None = None,
+    profile: bool | None = None,
+    output_path: str | None = None,
+    cscs_file: str | None = None,
+    compression: int | None = None,
+):
+    """
+    Reconcile one or more workbooks. Every IX TRAC sheet the mapping
+    targets in every workbook is matched against one CSCS index, taken
+    from `cscs_index`, or else from `cscs_file` (default: the first workbook).
+    `compression` is the zip level of the saved output (0-9, 0 = store only).
+    """
+    output_path = output_path or OUTPUT_PATH
+    files = [file_path] if isinstance(file_path, str) else list(file_path)
+
+    if not profiling_enabled(profile):
+        return _reconcile(files, mapping_name, backend, cscs_index, output_path, cscs_file, compression)
+
+    with RunProfiler(output_path):
+        _reconcile(files, mapping_name, backend, cscs_index, output_path, cscs_file, compression)
+    print(f"✔ Profile written next to {output_path}")
 
 
 # =================================================
-# Helper: decide what shows in MATCH_STATUS column
+# Helper: one output path per input workbook
 # =================================================
-def resolve_display_status(decision):
+def _output_paths(files, output_path):
     """
-    Certain validation failures must be visible directly
-    in the MATCH_STATUS column.
+    `output_path` itself for a single workbook, else <stem>_<input stem>
+    next to it; inputs sharing a stem get _2, _3, ... so no two outputs
+    (or their checkpoints) collide.
     """
-    if decision.reason == STATUS_POSITION_CSCS:
-        return STATUS_POSITION_CSCS
-
-    if decision.reason == STATUS_MORE_THAN_5:
-        return STATUS_MORE_THAN_5
-
-    return decision.status
+    if len(files) == 1:
+        return [output_path]
+
+    stem, ext = os.path.splitext(output_path)
+    paths = []
+    for path in files:
+        base = f"{stem}_{os.path.splitext(os.path.basename(path))[0]}"
+        candidate = base + ext
+        n = 2
+        while candidate.lower() in (p.lower() for p in paths):
+            candidate = f"{base}_{n}{ext}"
+            n += 1
+        paths.append(candidate)
+    return paths
 
 
 # =================================================
-# Main reconciliation entry point
+# Helper: parse the CSCS while the IX TRAC workbook loads
 # =================================================
-def run_reconciliation(file_path: str, mapping_name: str):
-    os.makedirs("output", exist_ok=True)
-    output_path = "output/IXTRAC_RECONCILED.xlsx"
+def _read_cscs(sources, name_col):
+    if is_federated(sources):
+        # Several CSCS extracts merged into one source-tagged frame
+        return load_sources(sources, name_col)
+    return load_excel(sources[0]["file"], sources[0]["sheet"])
 
-    mappings = load_mappings()
-    if mapping_name not in mappings:
-        raise ValueError(f"Unknown mapping: {mapping_name}")
 
-    mapping = mappings[mapping_name]
+def _start_cscs_read(sources, name_col):
+    """
+    Start parsing the CSCS in a worker process, to overlap the IX TRAC
+    load here. Only the frame comes back: pickling the built index costs
+    more than building it. Returns a Future, or None without a worker.
+    """
+    try:
+        pool = ProcessPoolExecutor(max_workers=1)
+    except (OSError, NotImplementedError):
+        return None
+    reading = pool.submit(_read_cscs, sources, name_col)
+    pool.shutdown(wait=False)
+    return reading
 
-    # =================================================
-    # LOAD CSCS
-    # =================================================
-    cscs = load_excel(file_path, mapping["cscs_sheet"])
+
+# =================================================
+# Helper: load the CSCS index once for all targets
+# =================================================
+def _load_cscs(mapping, sources, cscs_index, backend, rules, reading=None):
+    """
+    Returns (match_chunk, duplicates_df, fingerprint, close).
+    match_chunk maps a list of (name, chn) pairs to MatchDecisions.
+    `reading` is the in-memory CSCS frame being parsed by _start_cscs_read.
+    """
     cscs_name_col = mapping.get("cscs_name", "NAME")
+    cscs_file = sources[0]["file"]
+
+    if cscs_index:
+        # Persisted index kept current with delta files (core.delta)
+        if not os.path.exists(cscs_index):
+            raise FileNotFoundError(f"CSCS index not found: {cscs_index}")
+        disk_index = DiskIndex(cscs_index)
+        fingerprint = disk_index.fingerprint
+    elif backend == BACKEND_DISK:
+        # CSCS larger than the memory budget: spill to an embedded database
+        disk_index = DiskIndex()
+        disk_index.load_sheet(cscs_file, mapping["cscs_sheet"], cscs_name_col, rules)
+        fingerprint = file_fingerprint(cscs_file)
+    else:
+        cscs = None
+        if reading is not None:
+            try:
+                cscs = reading.result()
+            except BrokenProcessPool:
+                print("⚠ CSCS worker process died; reading the CSCS here")
+        if cscs is None:
+            cscs = _read_cscs(sources, cscs_name_col)
+        # Keyed on the CSCS content, so edits elsewhere in its workbook
+        # (the IX TRAC sheets, usually) keep checkpoints and cached decisions
+        fingerprint = frame_fingerprint(cscs)
+
+        # Index build and CSCS duplicate detection
+        exact_index, two_name_index, duplicates_df = prepare_cscs(
+            cscs,
+            cscs_name_col,
+            rules,
+        )
 
-    if cscs_name_col not in cscs.columns:
-        raise ValueError("CSCS name column missing")
+        def match_chunk(pairs):
+            return [
+                match_row(name, chn, exact_index, two_name_index)
+                for name, chn in pairs
+            ]
 
-    cscs["NORM_NAME"] = cscs[cscs_name_col].apply(normalize_name)
-    cscs["FIRST2"] = cscs[cscs_name_col].apply(first_two_names)
+        return match_chunk, duplicates_df, fingerprint, lambda: None
 
-    exact_index = build_cscs_index(cscs)
-    two_name_index = build_cscs_index_2name(cscs)
+    def match_chunk(pairs):
+        return disk_index.match_many(pairs, rules)
 
-    # =================================================
-    # CSCS DUPLICATE DETECTION
-    # =================================================
-    duplicates_df = detect_duplicates(
-        cscs,
-        ["NORM_NAME", "CHN"]
-    )
+    return match_chunk, disk_index.duplicates(), fingerprint, disk_index.close
 
-    # =================================================
-    # LOAD IX TRAC (OPEN ONCE)
-    # =================================================
-    wb = load_workbook(file_path)
-    sheet = wb[mapping["ixtrac_sheet"]]
 
+# =================================================
+# Helper: match one IX TRAC sheet, writing results into it
+# =================================================
+def _reconcile_sheet(sheet, mapping, rules, match_chunk, checkpoint):
     validate_mapping(sheet, mapping)
     cols = resolve_columns(sheet, mapping)
 
-    decisions = []
+    rows = [
+        (r, sheet.cell(r, cols["name"]).value, sheet.cell(r, cols["chn"]).value)
+        for r in range(2, sheet.max_row + 1)
+    ]
 
-    # =================================================
-    # RECONCILIATION LOOP
-    # =================================================
-    for r in range(2, sheet.max_row + 1):
-        name = sheet.cell(r, cols["name"]).value
-        chn = sheet.cell(r, cols["chn"]).value
-
-        decision = match_row(
-            name,
-            chn,
-            exact_index,
-            two_name_index
-        )
+    done = checkpoint.load()
+    if done:
+        print(f"✔ Resuming from checkpoint: {len(done)} rows already reconciled")
+
+    decisions = decide_rows(
+        rows, match_chunk, rules.statuses, done, checkpoint.record, checkpoint.every
+    )
+    checkpoint.flush()
 
-        sheet.cell(r, cols["membercode"]).value = decision.membercode or ""
-        sheet.cell(r, cols["status"]).value = resolve_display_status(decision)
+    for record in decisions:
+        r = record["ROW"]
+        sheet.cell(r, cols["membercode"]).value = record["MEMBERCODE"] or ""
+        sheet.cell(r, cols["status"]).value = record["DISPLAY_STATUS"]
 
-        decisions.append({
-            "ROW": r,
-            "NAME": name,
-            "CHN": chn,
-            "STATUS": decision.status,
-            "DISPLAY_STATUS": resolve_display_status(decision),
-            "MEMBERCODE": decision.membercode,
-            "REASON": decision.reason,
-        })
+    return decisions
+
+
+def _reconcile(files, mapping_name, backend, cscs_index, output_path, cscs_file, compression):
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+    mappings = load_mappings()
+    if mapping_name not in mappings:
+        raise ValueError(f"Unknown mapping: {mapping_name}")
 
-    # SAVE ENRICHED IX TRAC FIRST
-    wb.save(output_path)
+    mapping = mappings[mapping_name]
+    cscs_index = cscs_index or mapping.get("cscs_index")
+    cscs_file = cscs_file or files[0]
+    status_col = mapping["status_out"]
 
     # =================================================
-    # BUILD REVIEW / SUMMARY DATAFRAMES
+    # PREFLIGHT (HEADERS + SIZES ONLY, NO FULL PARSE)
     # =================================================
-    ix_df = pd.read_excel(output_path, sheet_name=mapping["ixtrac_sheet"])
-    status_col = mapping["status_out"]
+    mark_phase("preflight")
+    started = time.perf_counter()
+    # The process peak only reflects this run when nothing earlier (a
+    # previous run in the same GUI session, say) already pushed it higher
+    # than the memory in use now; page accounting allows a little slack
+    baseline = rss_bytes()
+    baseline_peak = peak_rss_bytes()
+    peak_measurable = bool(baseline and baseline_peak and baseline >= baseline_peak * 0.98)
+
+    sources = cscs_sources(mapping, cscs_file)
+    federated = is_federated(sources)
+    if federated and (cscs_index or backend == BACKEND_DISK):
+        raise ValueError(
+            "Federated CSCS sources are indexed in memory; "
+            "a disk backend or persisted index cannot be used with them"
+        )
 
-    review_df = ix_df.copy()
-    review_df["__rank"] = review_df[status_col].map(STATUS_PRIORITY)
-    review_df = review_df.sort_values("__rank").drop(columns="__rank")
+    report = run_preflight(files, mapping, None if cscs_index else sources)
+    for warning in report.warnings:
+        print(f"⚠ {warning}")
 
-    summary_df = (
-        review_df[status_col]
-        .value_counts()
-        .reset_index()
-        .rename(columns={"index": "STATUS", status_col: "COUNT"})
+    print(
+        f"✔ Preflight: {report.ixtrac_rows} IX TRAC rows in {len(files)} workbook(s), "
+        f"{report.cscs_rows} CSCS rows"
+        f"{f' from {len(sources)} sources' if federated else ''}, "
+        f"~{report.estimated_peak_mb:.0f} MB, ~{report.estimated_seconds:.0f}s"
     )
+    backend = backend or report.backend
+
+    # Each IX TRAC workbook is loaded in full, every sheet as cells. A CSCS
+    # sheet inside it would be materialized anyway, so indexing it on disk
+    # saves nothing: it has to come from its own workbook or an index
+    inputs = {os.path.abspath(path) for path in files}
+    if backend == BACKEND_DISK and not cscs_index and os.path.abspath(sources[0]["file"]) in inputs:
+        raise ValueError(
+            f"The CSCS needs the disk backend (~{report.estimated_peak_mb:.0f} MB estimated in"
+            " memory) but sits in the IX TRAC workbook, which is loaded in full."
+            " Move the CSCS sheet to its own workbook"
+            " and pass it with --cscs-file, or build an index with"
+            " `cscs_index.py build` and pass --cscs-index."
+        )
 
-    summary_df.loc[len(summary_df)] = {
-        "STATUS": "TOTAL_ROWS",
-        "COUNT": len(review_df),
-    }
+    # =================================================
+    # LOAD CSCS (ONCE FOR ALL TARGETS)
+    # =================================================
+    rules = compile_rules(mapping)
+    reading = None
+    preloaded = None
+    if not cscs_index and backend != BACKEND_DISK:
+        # The CSCS is parsed in a worker while the first IX TRAC workbook
+        # loads here; the index is then built from it on this process
+        reading = _start_cscs_read(sources, mapping.get("cscs_name", "NAME"))
+    if reading is not None:
+        mark_phase("load_ixtrac")
+        preloaded = load_workbook(files[0])
+
+    mark_phase("load_cscs")
+    match_chunk, duplicates_df, cscs_fingerprint, close_index = _load_cscs(
+        mapping, sources, cscs_index, backend, rules, reading
+    )
 
-    decision_df = pd.DataFrame(decisions)
+    # Decisions from earlier runs against the same CSCS and rules
+    store = DecisionStore(setting("DECISION_STORE")) if setting("DECISION_STORE") else None
+    run_cache_key = cache_key(cscs_fingerprint, mapping, rules)
+    if store is not None and setting("DECISION_CACHE"):
+        match_chunk = store.cached(match_chunk, run_cache_key)
+
+    summaries = {}
+    outputs = []
+
+    try:
+        basenames = [os.path.basename(path) for path in files]
+        for path, out_path in zip(files, _output_paths(files, output_path)):
+            # Same-named inputs from different folders keep their path in labels
+            workbook_label = os.path.basename(path)
+            if basenames.count(workbook_label) > 1:
+                workbook_label = path
+
+            # =================================================
+            # LOAD IX TRAC (OPEN ONCE PER WORKBOOK)
+            # =================================================
+            mark_phase("load_ixtrac")
+            wb = preloaded if preloaded is not None else load_workbook(path)
+            preloaded = None
+            targets = ixtrac_sheet_names(mapping, wb.sheetnames)
+            multi = len(files) > 1 or len(targets) > 1
+            input_fingerprint = file_fingerprint(path)
+
+            # =================================================
+            # RECONCILIATION LOOP
+            # =================================================
+            mark_phase("match")
+            checkpoints = []
+            sheet_decisions = {}
+
+            for i, sheet_name in enumerate(targets):
+                checkpoint = Checkpoint(
+                    out_path + (f".{i}" if i else "") + ".ckpt",
+                    checkpoint_key(input_fingerprint, cscs_fingerprint, mapping, sheet_name),
+                    every=setting("CHECKPOINT_EVERY"),
+                )
+                checkpoints.append(checkpoint)
+                sheet_decisions[sheet_name] = _reconcile_sheet(
+                    wb[sheet_name], mapping, rules, match_chunk, checkpoint
+                )
+
+            # =================================================
+            # BUILD REVIEW / SUMMARY DATAFRAMES
+            # =================================================
+            mark_phase("review_summary")
+            review_frames = []
+            decision_frames = []
+            workbook_summaries = {}
+
+            for sheet_name in targets:
+                label = sheet_name if len(files) == 1 else f"{workbook_label}/{sheet_name}"
+
+                review_df = review_frame(sheet_to_frame(wb[sheet_name]), status_col)
+                decision_df = pd.DataFrame(sheet_decisions[sheet_name])
+                workbook_summaries[label] = summary_frame(review_df, status_col)
+
+                if multi:
+                    review_df.insert(0, "TARGET", label)
+                    decision_df.insert(0, "TARGET", label)
+                review_frames.append(review_df)
+                decision_frames.append(decision_df)
+
+            review_df = pd.concat(review_frames, ignore_index=True)
+            decision_df = pd.concat(decision_frames, ignore_index=True)
+            summaries.update(workbook_summaries)
+            if multi:
+                summary_df = combined_summary(workbook_summaries)
+            else:
+                summary_df = workbook_summaries[targets[0]]
+
+            # =================================================
+            # WRITE EXTRA SHEETS (NO pandas.ExcelWriter)
+            # =================================================
+            mark_phase("write_sheets")
+            # Tables past Excel's row limit continue in companion workbooks
+            # and are serialized at save time, on worker processes when large
+            shards = OutputShards(out_path)
+            deferred = {}
+            write_df_to_sheet(wb, "IX_TRAC_REVIEW", review_df, shards, deferred)
+            write_df_to_sheet(wb, "RECONCILIATION_SUMMARY", summary_df, shards, deferred)
+            write_df_to_sheet(wb, "DECISION_LOG", decision_df, shards, deferred)
+            write_df_to_sheet(wb, "CSCS_DUPLICATES", duplicates_df, shards, deferred)
+            shards.finish(wb)
+
+            mark_phase("save_final")
+            save_workbook_atomic(wb, out_path, compression=compression, deferred=deferred)
+            for checkpoint in checkpoints:
+                checkpoint.remove()
+
+            if store is not None:
+                mark_phase("record_decisions")
+                for sheet_name in targets:
+                    store.record_run(
+                        mapping_name,
+                        mapping,
+                        sheet_decisions[sheet_name],
+                        input_file=os.path.abspath(path),
+                        sheet=sheet_name,
+                        input_fingerprint=input_fingerprint,
+                        cscs_fingerprint=cscs_fingerprint,
+                        cache_key=run_cache_key,
+                    )
+
+            outputs.append(out_path)
+            del wb
+    finally:
+        close_index()
+        if store is not None:
+            store.close()
 
     # =================================================
-    # WRITE EXTRA SHEETS (NO pandas.ExcelWriter)
+    # COMBINED SUMMARY ACROSS WORKBOOKS
     # =================================================
-    write_df_to_sheet(wb, "IX_TRAC_REVIEW", review_df)
-    write_df_to_sheet(wb, "RECONCILIATION_SUMMARY", summary_df)
-    write_df_to_sheet(wb, "DECISION_LOG", decision_df)
-    write_df_to_sheet(wb, "CSCS_DUPLICATES", duplicates_df)
-
-    wb.save(output_path)
+    if len(files) > 1:
+        stem, ext = os.path.splitext(output_path)
+        summary_path = f"{stem}_SUMMARY{ext}"
+        summary_wb = Workbook()
+        summary_wb.remove(summary_wb.active)
+        write_df_to_sheet(summary_wb, "RECONCILIATION_SUMMARY", combined_summary(summaries))
+        save_workbook_atomic(summary_wb, summary_path, compression=compression)
+        outputs.append(summary_path)
+
+    peak = peak_rss_bytes()
+    record_calibration(
+        report.ixtrac_rows,
+        report.cscs_rows,
+        time.perf_counter() - started,
+        peak - baseline if peak_measurable and peak and peak > baseline else None,
+        "index" if cscs_index else backend,
+    )
 
     print("✔ Reconciliation complete")
-    print(f"✔ Output written to {output_path}")
+    if store is not None and store.hits:
+        print(f"✔ {store.hits} rows answered from earlier runs' decisions")
+    if len(summaries) > 1:
+        print(f"✔ {len(summaries)} IX TRAC sheets reconciled against one CSCS index")
+    for path in outputs:
+        print(f"✔ Output written to {path}")
+
+
+def detect_mapping_name(file_path):
+    """
+    Best-fitting saved mapping for a workbook, from its headers only.
+    """
+    ranked = rank_mappings(file_path, load_mappings())
+    if not ranked or not ranked[0].fits:
+        closest = ""
+        if ranked and ranked[0].score > 0:
+            closest = f"\n\nClosest: {ranked[0].name} (missing {', '.join(ranked[0].missing)})"
+        raise MappingError(f"No saved mapping fits {os.path.basename(file_path)}.{closest}")
+
+    print(f"✔ Detected mapping: {ranked[0].name}")
+    return ranked[0].name
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CSCS ↔ IX TRAC reconciliation")
+    parser.add_argument("file", nargs="+", help="Excel workbook(s) containing the IX TRAC sheets")
+    parser.add_argument(
+        "mapping",
+        help='Mapping name from config/mappings.json, or "auto" to pick it from the headers',
+    )
+    parser.add_argument("--cscs-file", help="Workbook holding the CSCS sheet (default: the first file)")
+    parser.add_argument(
+        "--backend",
+        choices=["memory", "disk"],
+        help="Force the CSCS index backend; disk needs the CSCS in its own workbook (--cscs-file)",
+    )
+    parser.add_argument("--cscs-index", help="Persisted CSCS index to match against")
+    parser.add_argument(
+        "--output",
+        help=f"Output workbook (default: {OUTPUT_PATH}); with several files, outputs are named after it",
+    )
+    parser.add_argument(
+        "--compression",
+        type=int,
+        choices=range(10),
+        metavar="0-9",
+        help="Zip level of the output (0 = store only, fastest; default from settings)",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        default=None,
+        help="Write cProfile, allocation and flamegraph data next to the output",
+    )
+    args = parser.parse_args()
+
+    mapping_name = args.mapping
+    if mapping_name == "auto":
+        mapping_name = detect_mapping_name(args.file[0])
+
+    run_reconciliation(
+        args.file,
+        mapping_name,
+        backend=args.backend,
+        cscs_index=args.cscs_index,
+        profile=args.profile,
+        cscs_file=args.cscs_file,
+        compression=args.compression,
+        output_path=args.output,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import io
+
+import pandas as pd
+import pytest
+
+from core.api import reconcile, reconcile_workbook
+from core.mapping import MappingError
+
+MAPPING = {
+    "cscs_sheet": "CSCS",
+    "ixtrac_sheet": "IX TRAC",
+    "name": "NAME",
+    "chn": "CHN",
+    "membercode_out": "MEMBERCODE",
+    "status_out": "MATCH_STATUS",
+}
+
+
+def _workbook():
+    cscs = pd.DataFrame({
+        "NAME": ["JOHN OKAFOR ADE", "MARY BELLO EZE"],
+        "CHN": ["C001", "C002"],
+        "MEMBERCODE": ["AB1", "XY22"],
+    })
+    january = pd.DataFrame({"NAME": ["JOHN OKAFOR ADE", "NOBODY"], "CHN": ["C001", "C009"]})
+    february = pd.DataFrame({"NAME": ["MARY BELLO EZE"], "CHN": ["C002"]})
+
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+        cscs.to_excel(writer, sheet_name="CSCS", index=False)
+        january.to_excel(writer, sheet_name="IX TRAC 2025-01", index=False)
+        february.to_excel(writer, sheet_name="IX TRAC 2025-02", index=False)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("spec", ["IX TRAC *", ["IX TRAC 2025-01", "IX TRAC 2025-02"]])
+def test_reconcile_workbook_targets_every_sheet(spec):
+    result = reconcile_workbook(_workbook(), dict(MAPPING, ixtrac_sheet=spec))
+
+    assert list(result.results) == ["IX TRAC 2025-01", "IX TRAC 2025-02"]
+    january = result.results["IX TRAC 2025-01"]
+    assert january.ixtrac_sheet == "IX TRAC 2025-01"
+    assert list(january.enriched["MEMBERCODE"]) == ["AB1", ""]
+    assert list(result.results["IX TRAC 2025-02"].enriched["MEMBERCODE"]) == ["XY22"]
+
+    totals = result.summary[result.summary["TARGET"] == "ALL"].set_index("STATUS")["COUNT"]
+    assert totals["TOTAL_ROWS"] == 3
+
+
+def test_reconcile_single_glob_target():
+    result = reconcile(_workbook(), dict(MAPPING, ixtrac_sheet="IX TRAC *-02"))
+    assert result.ixtrac_sheet == "IX TRAC 2025-02"
+    assert list(result.decisions["ROW"]) == [2]
+
+
+def test_reconcile_rejects_several_targets():
+    with pytest.raises(MappingError, match="reconcile_workbook"):
+        reconcile(_workbook(), dict(MAPPING, ixtrac_sheet="IX TRAC *"))
@@ -0,0 +1,45 @@
+import pandas as pd
+
+import core.preflight as preflight
+from core.checkpoint import frame_fingerprint
+from reconcile import run_reconciliation
+
+
+def _workbook(path, ixtrac):
+    cscs = pd.DataFrame({
+        "NAME": ["JOHN OKAFOR ADE", "MARY BELLO EZE", "ADE EZE BOLA"],
+        "CHN": ["C001", "C002", 1500],
+        "MEMBERCODE": ["AB1", "XY22", "QQ"],
+    })
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        cscs.to_excel(writer, sheet_name="CSCS", index=False)
+        ixtrac.to_excel(writer, sheet_name="IX TRAC", index=False)
+
+
+def test_ixtrac_edits_keep_cached_decisions(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("IXTRAC_DECISION_STORE", str(tmp_path / "decisions.sqlite"))
+    monkeypatch.setattr(preflight, "CALIBRATION_PATH", str(tmp_path / "calibration.json"))
+
+    ixtrac = pd.DataFrame({
+        "NAME": ["JOHN OKAFOR ADE", "MARY BELLO EZE", "ADE EZE BOLA"],
+        "CHN": ["C001", "C002", 1500],
+        "OTHER": [1, 2, 3],
+    })
+    book = tmp_path / "book.xlsx"
+    _workbook(book, ixtrac)
+    run_reconciliation(str(book), "IXTRAC_STANDARD", output_path=str(tmp_path / "out.xlsx"))
+    assert "answered from earlier runs" not in capsys.readouterr().out
+
+    # Same CSCS sheet, edited IX TRAC sheet: a different workbook file
+    ixtrac.loc[1, "OTHER"] = 99
+    ixtrac.loc[3] = ["NEW HOLDER X", "C004", 4]
+    _workbook(book, ixtrac)
+    run_reconciliation(str(book), "IXTRAC_STANDARD", output_path=str(tmp_path / "out.xlsx"))
+    assert "✔ 3 rows answered from earlier runs' decisions" in capsys.readouterr().out
+
+
+def test_frame_fingerprint_tells_numbers_from_text():
+    numeric = pd.DataFrame({"CHN": [1500, "C001"]}, dtype=object)
+    text = pd.DataFrame({"CHN": ["1500", "C001"]}, dtype=object)
+    assert frame_fingerprint(numeric) != frame_fingerprint(text)
+    assert frame_fingerprint(numeric) == frame_fingerprint(numeric.copy())
@@ -0,0 +1,45 @@
+from core.delta import load_delta
+from core.diskindex import DiskIndex
+from core.membercode_rules import MembercodeRules
+
+COLUMNS = ["NAME", "CHN", "MEMBERCODE"]
+
+
+def _index():
+    index = DiskIndex(engine="sqlite")
+    rows = [
+        ("JOHN OKAFOR", 1500, "AB1"),
+        ("MARY BELLO", "C0007", "XY22"),
+        ("ADE EZE", 2500, "QQ"),
+    ]
+    index.load_rows(COLUMNS, iter(rows), "NAME", MembercodeRules())
+    return index
+
+
+def test_csv_delta_keeps_text_and_matches_numeric_chn(tmp_path):
+    delta = tmp_path / "delta.csv"
+    delta.write_text(
+        "ACTION,CHN,NAME,MEMBERCODE\n"
+        "UPDATE,1500,,01234\n"
+        "REMOVE,C0007,MARY BELLO,\n"
+        "ADD,3000,BOLA EZE,00912\n"
+        "REMOVE,9999,,\n"
+        "UPDATE,C0008,,NEW\n"
+    )
+    changes = load_delta(str(delta))
+    assert changes[0]["MEMBERCODE"] == "01234"
+    assert changes[2]["CHN"] == 3000
+    assert changes[1]["MEMBERCODE"] is None
+
+    index = _index()
+    try:
+        counts = index.apply_delta(changes)
+        assert (counts["ADD"], counts["REMOVE"], counts["UPDATE"]) == (1, 1, 1)
+        assert counts["UNMATCHED"] == [("REMOVE", 9999, None), ("UPDATE", "C0008", None)]
+
+        decisions = index.match_many([("JOHN OKAFOR", 1500), ("MARY BELLO", "C0007"), ("BOLA EZE", 3000)])
+        assert decisions[0].membercode == "01234"
+        assert decisions[1].status == "NOT FOUND"
+        assert decisions[2].membercode == "00912"
+    finally:
+        index.close()
@@ -0,0 +1,59 @@
+import random
+
+import pandas as pd
+import pytest
+
+from core.diskindex import DiskIndex, duckdb
+from core.engine import match_row
+from core.matcher import prepare_cscs
+from core.membercode_rules import MembercodeRules
+
+FIRST = ["JOHN", "MARY", "ADE", "BOLA", "CHIDI"]
+LAST = ["OKAFOR", "BELLO", "EZE"]
+CODES = ["AB1", "XY22", "RG001", "TOOLONG1", "", None, "QQ"]
+
+
+def _cscs(n=400, seed=7):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(n):
+        name = f"{rng.choice(FIRST)} {rng.choice(LAST)} {rng.choice(FIRST)}"
+        chn = rng.choice([rng.randint(1, n // 4), f"C{rng.randint(1, n // 4):04d}"])
+        rows.append((name, chn, rng.choice(CODES)))
+    return rows
+
+
+def _queries(rows, seed=11):
+    rng = random.Random(seed)
+    pairs = []
+    for name, chn, _ in rng.sample(rows, 200):
+        if rng.random() < 0.3:
+            name = " ".join(name.split()[:2]) + " X"
+        if rng.random() < 0.1:
+            chn = "NOPE"
+        if rng.random() < 0.05:
+            name = None
+        pairs.append((name, chn))
+    return pairs
+
+
+@pytest.mark.parametrize("engine", [
+    "sqlite",
+    pytest.param("duckdb", marks=pytest.mark.skipif(duckdb is None, reason="duckdb not installed")),
+])
+def test_match_many_equals_match_row(engine):
+    rows = _cscs()
+    pairs = _queries(rows)
+    rules = MembercodeRules()
+
+    cscs = pd.DataFrame(rows, columns=["NAME", "CHN", "MEMBERCODE"])
+    exact_index, two_name_index, duplicates_df = prepare_cscs(cscs, "NAME", rules)
+    expected = [match_row(name, chn, exact_index, two_name_index) for name, chn in pairs]
+
+    index = DiskIndex(engine=engine)
+    try:
+        index.load_rows(["NAME", "CHN", "MEMBERCODE"], iter(rows), "NAME", rules)
+        assert index.match_many(pairs, rules) == expected
+        assert len(index.duplicates()) == len(duplicates_df)
+    finally:
+        index.close()
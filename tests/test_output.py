@@ -0,0 +1,85 @@
+import datetime
+import io
+
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+from openpyxl.utils.dataframe import dataframe_to_rows
+from openpyxl.worksheet._writer import WorksheetWriter
+
+import core.output as output
+from core.output import _sheet_xml, save_workbook, write_df_to_sheet
+
+
+def _frame():
+    return pd.DataFrame({
+        "INT": [1, 2, None, 4],
+        "FLOAT": [1.5, float("nan"), float("inf"), -0.25],
+        "TEXT": ["plain", " padded ", "<a & b>", None],
+        "FLAG": [True, False, True, None],
+    })
+
+
+def _openpyxl_xml(df, title):
+    wb = Workbook()
+    ws = wb.active
+    ws.title = title
+    ws.sheet_view.tabSelected = None
+    for row in dataframe_to_rows(df, index=False, header=True):
+        ws.append(row)
+    writer = WorksheetWriter(ws)
+    writer.write()
+    try:
+        return writer.read()
+    finally:
+        writer.cleanup()
+
+
+def test_sheet_xml_matches_openpyxl():
+    df = _frame()
+    assert _sheet_xml(df, "DECISION_LOG") == _openpyxl_xml(df, "DECISION_LOG")
+
+
+def test_deferred_save_round_trip():
+    df = _frame()
+    # NaN and infinities come back empty, as openpyxl itself writes them
+    expected = [
+        ["INT", "FLOAT", "TEXT", "FLAG"],
+        [1, 1.5, "plain", True],
+        [2, None, " padded ", False],
+        [None, None, "<a & b>", True],
+        [4, -0.25, None, None],
+    ]
+
+    wb = Workbook()
+    wb.remove(wb.active)
+    deferred = {}
+    write_df_to_sheet(wb, "DECISION_LOG", df, deferred=deferred)
+    buffer = io.BytesIO()
+    save_workbook(wb, buffer, 6, deferred)
+
+    ws = load_workbook(buffer)["DECISION_LOG"]
+    assert [list(row) for row in ws.values] == expected
+
+
+def test_styled_values_fall_back_to_openpyxl():
+    df = pd.DataFrame({"DATE": [datetime.datetime(2024, 1, 2)], "N": [1]})
+    assert _sheet_xml(df, "S") is None
+
+    wb = Workbook()
+    wb.remove(wb.active)
+    deferred = {}
+    write_df_to_sheet(wb, "S", df, deferred=deferred)
+    buffer = io.BytesIO()
+    save_workbook(wb, buffer, 6, deferred)
+
+    ws = load_workbook(buffer)["S"]
+    assert list(ws.values) == [("DATE", "N"), (datetime.datetime(2024, 1, 2), 1)]
+
+
+def test_unknown_skeleton_falls_back(monkeypatch):
+    class ChangedWriter(WorksheetWriter):
+        def read(self):
+            return super().read().replace(b"<sheetData></sheetData>", b"<sheetData/>")
+
+    monkeypatch.setattr(output, "WorksheetWriter", ChangedWriter)
+    assert _sheet_xml(_frame(), "S") is None
@@ -0,0 +1,89 @@
+import io
+import zipfile
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+import core.xlsxmeta as xlsxmeta
+from core.xlsxmeta import XlsxHeaders
+
+NS = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+
+def _archive(sheet_xml, strings):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as z:
+        z.writestr(
+            "_rels/.rels",
+            f'<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'<Relationship Id="rId1" Type="{REL}/officeDocument" Target="xl/workbook.xml"/>'
+            "</Relationships>",
+        )
+        z.writestr(
+            "xl/workbook.xml",
+            f'<workbook {NS} xmlns:r="{REL}"><sheets>'
+            '<sheet name="DATA" sheetId="1" r:id="rId1"/></sheets></workbook>',
+        )
+        z.writestr(
+            "xl/_rels/workbook.xml.rels",
+            f'<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'<Relationship Id="rId1" Type="{REL}/worksheet" Target="worksheets/sheet1.xml"/>'
+            f'<Relationship Id="rId2" Type="{REL}/sharedStrings" Target="/xl/sharedStrings.xml"/>'
+            "</Relationships>",
+        )
+        z.writestr("xl/worksheets/sheet1.xml", f"<worksheet {NS}><sheetData>{sheet_xml}</sheetData></worksheet>")
+        z.writestr("xl/sharedStrings.xml", f"<sst {NS}>{strings}</sst>")
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.mark.parametrize("chunk_size", [1 << 20, 7])
+def test_headers_from_shared_strings_without_dimension(monkeypatch, chunk_size):
+    # Small chunks cut items and row tags at every possible boundary
+    monkeypatch.setattr(xlsxmeta, "_CHUNK_SIZE", chunk_size)
+    strings = (
+        "<si><t>unused</t></si>"
+        "<si><t> NAME </t></si>"
+        '<si><r><t>C</t></r><r><rPr><b/></rPr><t>HN</t></r><rPh sb="0" eb="1"><t>x</t></rPh></si>'
+        "<si><t>A &amp; B</t></si>"
+        "<si/>"
+    )
+    sheet = (
+        '<row r="1"><c r="A1" t="s"><v>1</v></c><c r="B1" t="s"><v>2</v></c>'
+        '<c r="D1" t="s"><v>3</v></c><c r="E1"><v>2025</v></c>'
+        '<c r="F1" t="inlineStr"><is><t>INLINE</t></is></c></row>'
+        '<row r="2"><c r="A2" t="s"><v>0</v></c><c r="B2"><v>1500</v></c></row>'
+        '<row r="3"><c r="B3" t="s"><v>0</v></c></row>'
+        '<row r="7"><c r="B7" t="str"><v>C7</v></c></row>'
+    )
+    with XlsxHeaders(_archive(sheet, strings)) as wb:
+        assert wb.sheetnames == ["DATA"]
+        header = wb.read(["DATA"], sample_rows=2)["DATA"]
+
+    assert header.headers == ["NAME", "CHN", "", "A & B", "2025", "INLINE"]
+    assert header.rows == 6
+    assert header.column_kinds(1) == {"number": 1, "text": 1}
+
+
+def test_matches_openpyxl(tmp_path):
+    path = tmp_path / "book.xlsx"
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        pd.DataFrame({"NAME": ["A", "B", "C"], "CHN": [1, "C2", 3.5]}).to_excel(
+            writer, sheet_name="IX TRAC", index=False
+        )
+        pd.DataFrame({"X": []}).to_excel(writer, sheet_name="EMPTY", index=False)
+
+    wb = load_workbook(path, read_only=True)
+    expected = {
+        ws.title: ([str(v) for v in next(ws.iter_rows(max_row=1, values_only=True))], ws.max_row - 1)
+        for ws in wb.worksheets
+    }
+    wb.close()
+
+    with XlsxHeaders(path) as headers:
+        got = headers.read(headers.sheetnames, sample_rows=200)
+
+    assert {name: (h.headers, h.rows) for name, h in got.items()} == expected
+    assert got["IX TRAC"].column_kinds(1) == {"number": 2, "text": 1}
@@ -9,6 +9,12 @@ class WizardState:
         # discovered headers from IX TRAC sheet
         self.headers = []
 
+        # {sheet: headers} of the whole file, read once (core.signature)
+        self.signature = {}
+
+        # closest saved mapping, used to pre-fill selections
+        self.suggested = {}
+
         # mapping to be saved
         self.mapping = {
             "cscs_sheet": None,
@@ -1,10 +1,11 @@
 import os
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk, filedialog, messagebox
-import pandas as pd
 
 from wizard.preview import generate_preview
-from core.mapping import save_mapping_safely
+from core.mapping import load_mappings, save_mapping_safely
+from core.signature import SignatureIndex, read_signature
 
 
 # =========================
@@ -102,9 +103,24 @@ class SheetSelectStep(ttk.Frame):
 
         wizard.render_header("Select Sheets")
 
+        # Sheet names and header rows only; no full parse, and off the
+        # Tk thread so the window keeps responding on large files
+        self.loading = ttk.Label(self, text="Reading sheets…")
+        self.loading.pack(anchor="w")
+        readers = ThreadPoolExecutor(max_workers=1)
+        self.reading = readers.submit(read_signature, wizard.state.file_path)
+        readers.shutdown(wait=False)
+        self.after(50, self.show_sheets)
+
+    def show_sheets(self):
+        if not self.reading.done():
+            self.after(50, self.show_sheets)
+            return
+
+        wizard = self.wizard
         try:
-            xl = pd.ExcelFile(wizard.state.file_path)
-            sheets = xl.sheet_names
+            wizard.state.signature = self.reading.result()
+            sheets = list(wizard.state.signature)
         except Exception:
             messagebox.showerror(
                 "Error",
@@ -113,11 +129,23 @@ class SheetSelectStep(ttk.Frame):
             )
             wizard.destroy()
             return
+        self.loading.destroy()
+
+        # Start from the closest saved format when one partly fits
+        mappings = load_mappings()
+        ranked = SignatureIndex(mappings).rank(wizard.state.signature)
+        suggested = mappings[ranked[0].name] if ranked and ranked[0].score > 0 else {}
+        wizard.state.suggested = suggested
+
+        def default_sheet(key, fallback):
+            if suggested.get(key) in sheets:
+                return suggested[key]
+            return fallback if fallback in sheets else sheets[0]
 
         ttk.Label(self, text="CSCS sheet (source of membercodes):").pack(anchor="w")
         self.cscs_var = tk.StringVar(
             master=wizard,
-            value="CSCS" if "CSCS" in sheets else sheets[0]
+            value=default_sheet("cscs_sheet", "CSCS")
         )
         ttk.Combobox(
             self,
@@ -133,7 +161,7 @@ class SheetSelectStep(ttk.Frame):
         ).pack(anchor="w")
         self.ix_var = tk.StringVar(
             master=wizard,
-            value="IX TRAC" if "IX TRAC" in sheets else sheets[0]
+            value=default_sheet("ixtrac_sheet", "IX TRAC")
         )
         ttk.Combobox(
             self,
@@ -163,15 +191,9 @@ class SheetSelectStep(ttk.Frame):
         self.wizard.state.mapping["cscs_sheet"] = self.cscs_var.get()
         self.wizard.state.mapping["ixtrac_sheet"] = self.ix_var.get()
 
-        df = pd.read_excel(
-            self.wizard.state.file_path,
-            sheet_name=self.ix_var.get(),
-            nrows=1
-        )
-
         self.wizard.state.headers = [
-            h for h in df.columns
-            if isinstance(h, str) and not h.strip().upper().startswith("UNNAMED")
+            h for h in self.wizard.state.signature[self.ix_var.get()]
+            if not h.upper().startswith("UNNAMED")
         ]
 
         self.wizard.next()
@@ -185,6 +207,7 @@ class ColumnMappingStep(ttk.Frame):
         super().__init__(parent, padding=20)
         self.wizard = wizard
         headers = wizard.state.headers
+        suggested = wizard.state.suggested
 
         wizard.render_header("Map Columns")
 
@@ -203,11 +226,15 @@ class ColumnMappingStep(ttk.Frame):
 
             if mode == "select":
                 box = ttk.Combobox(self, values=headers, textvariable=var, state="readonly")
+                if suggested.get(key) in headers:
+                    var.set(suggested[key])
             else:
                 box = ttk.Combobox(self, values=headers, textvariable=var, state="normal")
-                if key == "membercode_out":
+                if suggested.get(key):
+                    var.set(suggested[key])
+                elif key == "membercode_out":
                     var.set("MEMBERCODE")
-                if key == "status_out":
+                elif key == "status_out":
                     var.set("MATCH_STATUS")
 
             box.pack(fill="x")